@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-from google_sheets_db import GoogleSheetsConnector
+from storage_backend import get_backend
+from login_index import LOGIN_COLUMN, get_login_index, normalize_phone
 from admin_view import admin_main
 from organizer_view import organizer_main
 from user_view import user_main
@@ -17,6 +18,14 @@ st.set_page_config(
 USE_DUMMY_DATA = False
 # -----------------------------------------------------------------------------------------
 
+# --- [TOGGLE] Storage backend: "sheets" for live Google Sheets, "sqlite" for the local offline engine ---
+STORAGE_BACKEND = "sheets"
+SQLITE_DB_PATH = "pragyanai_seminar.db"  # seed Admins and Users first: python seed_sqlite.py SHEET_URL Admins admins.csv ...
+# -------------------------------------------------------------------------------------------------------
+
+# The Admins and Users tabs both live in this spreadsheet
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1nJq-DCS-bGMqtaVvU9VImWhOEet5uuL-uQHcMKBgSss/edit?usp=sharing"
+
 
 def load_dummy_data():
     """Generates and returns sample dataframes for offline testing."""
@@ -72,6 +81,7 @@ def main():
         st.session_state.logged_in = False
         st.session_state.user_role = None
         st.session_state.user_name = None
+        st.session_state.user_phone = None
         st.session_state.selected_seminar_title = None
 
     db_connector = None
@@ -80,30 +90,45 @@ def main():
         # Initialize dummy data in session state if it doesn't exist
         if 'dummy_admins_df' not in st.session_state:
             st.session_state.dummy_admins_df, st.session_state.dummy_users_df, _, _ = load_dummy_data()
-        
-        admins_df = st.session_state.dummy_admins_df
-        users_df = st.session_state.dummy_users_df
-        admin_sheet = None
-        user_sheet = None
     else:
         try:
-            db_connector = GoogleSheetsConnector()
-            SHEET_URL = "https://docs.google.com/spreadsheets/d/1nJq-DCS-bGMqtaVvU9VImWhOEet5uuL-uQHcMKBgSss/edit?usp=sharing"
-            admin_sheet = db_connector.get_worksheet(SHEET_URL, "Admins")
-            user_sheet = db_connector.get_worksheet(SHEET_URL, "Users")
-            admins_df = db_connector.get_dataframe(admin_sheet)
-            users_df = db_connector.get_dataframe(user_sheet)
+            if STORAGE_BACKEND == "sqlite":
+                db_connector = get_backend("sqlite", db_path=SQLITE_DB_PATH)
+            else:
+                db_connector = get_backend(STORAGE_BACKEND)
+            if db_connector.is_offline():
+                st.warning("Google Sheets is unreachable right now. Showing the last saved data; changes cannot be saved until it is back.")
         except Exception as e:
             st.error(f"Failed to connect to the database. Check secrets and sheet names. Error: {e}")
             return
 
     if not st.session_state.logged_in:
-        login_signup_forms(db_connector, admin_sheet, user_sheet, admins_df, users_df)
+        if db_connector:
+            db_connector.trace_page = "Login"
+        login_signup_forms(db_connector)
     else:
         menu(db_connector)
 
 
-def login_signup_forms(db_connector, admin_sheet, user_sheet, admins_df, users_df):
+def find_login_records(db_connector, worksheet_name, phone):
+    """Looks a phone number up in the Admins or Users records, only when a login or signup form is submitted.
+
+    The backend answers it: an indexed query on SQLite, the shared snapshot's login index
+    on Google Sheets, so rendering the login page itself makes no calls. Returns the
+    matching records (an empty frame if there are none), or None if they are unavailable.
+    """
+    if USE_DUMMY_DATA:
+        df = st.session_state.dummy_admins_df if worksheet_name == "Admins" else st.session_state.dummy_users_df
+        return get_login_index(df).records(phone)
+    try:
+        worksheet = db_connector.get_worksheet(SHEET_URL, worksheet_name)
+        return db_connector.find_records(worksheet, LOGIN_COLUMN, phone) if worksheet is not None else None
+    except Exception as e:
+        st.error(f"Failed to connect to the database. Check secrets and sheet names. Error: {e}")
+        return None
+
+
+def login_signup_forms(db_connector):
     """Displays the login and signup forms in tabs."""
     login_tab, signup_tab = st.tabs(["Login", "Sign Up"])
 
@@ -111,18 +136,18 @@ def login_signup_forms(db_connector, admin_sheet, user_sheet, admins_df, users_d
         admin_login_col, user_login_col = st.columns(2)
         with admin_login_col:
             st.header("Admin Login")
-            login_form(admins_df, role_check='Admin')
+            login_form(db_connector, role_check='Admin')
         with user_login_col:
             st.header("User / Organizer Login")
-            login_form(users_df, role_check=None)
+            login_form(db_connector, role_check=None)
 
     with signup_tab:
         st.header("Create a New Account")
-        signup_form(db_connector, user_sheet, users_df)
+        signup_form(db_connector)
 
 
-def login_form(data_df, role_check=None):
-    """Creates a login form and handles authentication using a dataframe."""
+def login_form(db_connector, role_check=None):
+    """Creates a login form and handles authentication against the Admins or Users records."""
     form_key = f"login_form_{role_check or 'user'}"
     with st.form(key=form_key):
         phone = st.text_input("Phone Number (Login ID)")
@@ -136,27 +161,29 @@ def login_form(data_df, role_check=None):
 
             sheet_name = 'Admins' if role_check else 'Users'
             required_columns = ['Phone(login)', 'Password', 'UserName'] if role_check else ['Phone(login)', 'Password', 'Status', 'Role', 'FullName']
+            records = find_login_records(db_connector, sheet_name, phone)
 
-            if data_df is None or not all(col in data_df.columns for col in required_columns):
+            if records is None or not all(col in records.columns for col in required_columns):
                 st.error(f"The '{sheet_name}' data is not available or is missing required columns: {', '.join(required_columns)}.")
                 return
 
-            user_record = data_df[data_df['Phone(login)'].astype(str).str.strip() == phone.strip()]
+            user_record = records.iloc[0] if not records.empty else None
 
-            if user_record.empty:
+            if user_record is None:
                 st.error("User not found. Check phone number or sign up.")
             else:
-                user_record = user_record.iloc[0]
                 if str(user_record['Password']).strip() == password.strip():
                     if role_check == 'Admin':
                         st.session_state.logged_in = True
                         st.session_state.user_role = 'Admin'
                         st.session_state.user_name = str(user_record['UserName']).strip()
+                        st.session_state.user_phone = normalize_phone(user_record['Phone(login)'])
                         st.rerun()
                     elif str(user_record['Status']).strip() == 'Approved':
                         st.session_state.logged_in = True
                         st.session_state.user_role = str(user_record['Role']).strip()
                         st.session_state.user_name = str(user_record['FullName']).strip()
+                        st.session_state.user_phone = normalize_phone(user_record['Phone(login)'])
                         st.rerun()
                     else:
                         st.warning("Your account is not yet approved by an admin.")
@@ -164,7 +191,7 @@ def login_form(data_df, role_check=None):
                     st.error("Incorrect password.")
 
 
-def signup_form(db_connector, user_sheet, users_df):
+def signup_form(db_connector):
     """Creates a signup form and handles new user registration."""
     with st.form(key="signup_form"):
         st.subheader("Personal Information")
@@ -202,9 +229,11 @@ def signup_form(db_connector, user_sheet, users_df):
                 st.error("Passwords do not match.")
                 return
             
+            registered = find_login_records(db_connector, "Users", phone_login)
+
             # --- MODIFIED: Handle signup in Dummy Data Mode ---
             if USE_DUMMY_DATA:
-                if users_df is not None and not users_df.empty and phone_login.strip() in users_df['Phone(login)'].astype(str).str.strip().values:
+                if registered is not None and not registered.empty:
                     st.error("This phone number is already registered in the dummy data.")
                     return
                 
@@ -225,17 +254,22 @@ def signup_form(db_connector, user_sheet, users_df):
 
             # --- Live Data Signup Logic ---
             try:
-                if users_df is not None and not users_df.empty and phone_login.strip() in users_df['Phone(login)'].astype(str).str.strip().values:
+                if registered is not None and not registered.empty:
                     st.error("This phone number is already registered.")
                     return
 
+                user_sheet = db_connector.get_worksheet(SHEET_URL, "Users")
+                if user_sheet is None:
+                    return
+
                 new_user_data = [
                     full_name, college, branch, reg_no, pass_year, phone_login,
                     phone_whatsapp, email, password, "Not Approved", "Student",
                     experience, brief_presenter, linkedin, github, interest_area
                 ]
-                db_connector.append_record(user_sheet, new_user_data)
-                st.success("Registration successful! An admin will approve your account shortly.")
+                # Queued for a batched background append; the user is acknowledged immediately
+                if db_connector.enqueue_record(user_sheet, new_user_data):
+                    st.success("Registration successful! An admin will approve your account shortly.")
             except Exception as e:
                 st.error(f"An error occurred during signup: {e}")
 
@@ -255,6 +289,8 @@ def menu(db_connector):
 
     selection = st.sidebar.radio("Go to", list(page_options.keys()))
     page_function = page_options[selection]
+    if db_connector:
+        db_connector.trace_page = selection
     
     try:
         page_function(db_connector)
@@ -268,6 +304,11 @@ def menu(db_connector):
         else:
             st.error(f"Error loading page '{selection}': {e}")
 
+    # --- Which sheets this rerun touched (the connector is created per rerun) ---
+    if user_role == 'Admin' and db_connector and db_connector.access_trace:
+        with st.sidebar.expander("🔎 Sheets touched this run"):
+            st.dataframe(pd.DataFrame(db_connector.access_trace), use_container_width=True, hide_index=True)
+
     if st.sidebar.button("Logout"):
         for key in list(st.session_state.keys()):
             del st.session_state[key]
@@ -1,7 +1,39 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import gspread # To find cell and update
+from user_directory import DEFAULT_COLUMNS, get_user_directory
+
+
+def format_cell(value):
+    """Formats a typed DataFrame value the way it is written in the sheet."""
+    if pd.isna(value):
+        return ""
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def record_field(col_name, value, key):
+    """Renders an input that matches the cell's type: a date picker for dates, text otherwise."""
+    if isinstance(value, (pd.Timestamp, datetime)) or (pd.isna(value) and col_name.endswith("_Date")):
+        return st.date_input(col_name, value=None if pd.isna(value) else value.date(), key=key)
+    return st.text_input(col_name, value=format_cell(value), key=key)
+
+
+def diff_record(original, submitted):
+    """Returns {column: sheet value} for only the fields whose submitted value differs from the snapshot row."""
+    changes = {}
+    for col_name, new_value in submitted.items():
+        old_value = original.get(col_name, "")
+        if new_value is None or not isinstance(new_value, str):
+            # A date picker: compare calendar dates, write the date the way the sheet stores it
+            old_date = None if pd.isna(old_value) else pd.Timestamp(old_value).date()
+            if new_value != old_date:
+                changes[col_name] = new_value.strftime("%Y-%m-%d") if new_value else ""
+        elif new_value.strip() != format_cell(old_value).strip():
+            changes[col_name] = new_value
+    return changes
+
 
 def admin_main(db_connector):
     """The main function for the Admin Dashboard page."""
@@ -16,16 +48,23 @@ def admin_main(db_connector):
     # Updated to match the user's provided sheet name
     #SEMINAR_WORKSHEET_NAME = "Seminar_Guest_Event_List"
     SEMINAR_WORKSHEET_NAME = "Seminar_Guest_Event_List"
-    # --- Data Loading and Caching ---
-    @st.cache_data(ttl=60) # Cache for 1 minute to keep data fresh
+    # --- Data Loading (the connector revalidates its cache against each sheet's revision) ---
     def load_data():
         try:
             user_sheet = db_connector.get_worksheet(USER_SHEET_URL, USER_WORKSHEET_NAME)
-            users_df = db_connector.get_dataframe(user_sheet) if user_sheet else pd.DataFrame()
-
             seminar_sheet = db_connector.get_worksheet(SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME)
-            seminars_df = db_connector.get_dataframe(seminar_sheet) if seminar_sheet else pd.DataFrame()
-            
+
+            # One batched values request per spreadsheet instead of one per worksheet
+            targets = [
+                target for target, sheet in [
+                    ((USER_SHEET_URL, USER_WORKSHEET_NAME), user_sheet),
+                    ((SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME), seminar_sheet),
+                ] if sheet
+            ]
+            frames = db_connector.get_dataframes(targets)
+            users_df = frames.get((USER_SHEET_URL, USER_WORKSHEET_NAME), pd.DataFrame())
+            seminars_df = frames.get((SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME), pd.DataFrame())
+
             return users_df, seminars_df, user_sheet, seminar_sheet
         except Exception as e:
             st.error(f"Failed to load data from Google Sheets: {e}")
@@ -33,6 +72,60 @@ def admin_main(db_connector):
 
     users_df, seminars_df, user_sheet, seminar_sheet = load_data()
 
+    # --- Bulk approvals: every selected record is written in one batched update ---
+    QUEUE_PAGE_SIZE = 50
+
+    def approval_queue(pending_df, key_col, columns, search_cols, filter_col, key):
+        """Shows a filterable, selectable approval queue and returns the keys to approve (empty until a button is clicked)."""
+        search_col, filter_col_ui = st.columns(2)
+        search = search_col.text_input("Search", key=f"{key}_search", placeholder=", ".join(search_cols))
+        choices = sorted(pending_df[filter_col].astype(str).unique()) if filter_col in pending_df.columns else []
+        chosen = filter_col_ui.multiselect(f"Filter by {filter_col}", choices, key=f"{key}_filter")
+
+        filtered = pending_df
+        if chosen:
+            filtered = filtered[filtered[filter_col].astype(str).isin(chosen)]
+        if search:
+            mask = pd.Series(False, index=filtered.index)
+            for col in search_cols:
+                if col in filtered.columns:
+                    mask |= filtered[col].astype(str).str.contains(search, case=False, regex=False)
+            filtered = filtered[mask]
+
+        # Only one page of the queue is rendered; "approve all filtered" still covers every page
+        page_count = max((len(filtered) + QUEUE_PAGE_SIZE - 1) // QUEUE_PAGE_SIZE, 1)
+        if st.session_state.get(f"{key}_page", 1) > page_count:
+            st.session_state[f"{key}_page"] = 1
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, key=f"{key}_page")
+        start = (int(page) - 1) * QUEUE_PAGE_SIZE
+        queue = filtered.iloc[start:start + QUEUE_PAGE_SIZE][[col for col in columns if col in filtered.columns]].copy()
+        queue.insert(0, "Select", False)
+        edited = st.data_editor(
+            queue, key=f"{key}_queue", hide_index=True, use_container_width=True,
+            disabled=[col for col in queue.columns if col != "Select"],
+        )
+        selected = edited.loc[edited["Select"], key_col].tolist()
+        filtered_keys = filtered[key_col].tolist()
+
+        selected_col, all_col = st.columns(2)
+        if selected_col.button(f"Approve selected ({len(selected)})", key=f"{key}_selected", disabled=not selected):
+            return selected
+        if all_col.button(f"Approve all filtered ({len(filtered_keys)})", key=f"{key}_all", disabled=not filtered_keys):
+            return filtered_keys
+        return []
+
+    def approve(sheet, key_col, keys, status_col, label):
+        """Sets status_col to 'Approved' for every key in one write; only this sheet's snapshot is refreshed."""
+        results = db_connector.update_records(sheet, key_col, {k: {status_col: 'Approved'} for k in keys})
+        if results is None:
+            return
+        approved = [k for k, ok in results.items() if ok]
+        if len(approved) < len(results):
+            st.error(f"{len(results) - len(approved)} {label} could not be approved.")
+        if approved:
+            st.success(f"Approved {len(approved)} {label}!")
+            st.rerun()
+
     # --- Tabbed Interface ---
     all_users_tab, user_approval_tab, seminar_list_tab, seminar_approval_tab, seminar_update_tab = st.tabs([
         "👥 All Users", "⏳ Users for Approvals", "🗓️ All Seminar Events", "⏳ Seminars for Approvals", "✍️ Update Seminar Info"
@@ -42,7 +135,30 @@ def admin_main(db_connector):
     with all_users_tab:
         st.subheader("Full User List")
         if not users_df.empty:
-            st.dataframe(users_df, use_container_width=True)
+            # Searched, sorted and paged on the server over the Users snapshot; only one page is sent to the browser
+            directory = get_user_directory(users_df)
+            search_col, sort_col, order_col = st.columns([3, 2, 1])
+            query = search_col.text_input(
+                "Search users", key="user_directory_search", placeholder="Name, phone, email or college"
+            )
+            sort_by = sort_col.selectbox("Sort by", directory.columns, key="user_directory_sort")
+            descending = order_col.toggle("Descending", key="user_directory_desc")
+            shown_columns = st.multiselect(
+                "Columns", directory.columns, key="user_directory_columns",
+                default=[c for c in DEFAULT_COLUMNS if c in directory.columns],
+            )
+
+            size_col, page_col = st.columns(2)
+            page_size = size_col.selectbox("Rows per page", [25, 50, 100], key="user_directory_page_size")
+            page_count = max((directory.count(query) + page_size - 1) // page_size, 1)
+            if st.session_state.get("user_directory_page", 1) > page_count:
+                st.session_state.user_directory_page = 1
+            page = page_col.number_input("Page", min_value=1, max_value=page_count, key="user_directory_page")
+            page_df, total = directory.page(query, sort_by, descending, int(page), page_size, shown_columns)
+
+            st.dataframe(page_df, use_container_width=True, hide_index=True)
+            first_row = (int(page) - 1) * page_size + 1 if total else 0
+            st.caption(f"Showing {first_row}–{first_row + len(page_df) - 1 if total else 0} of {total} users · page {int(page)} of {page_count}")
         else:
             st.warning("Could not load user data.")
             
@@ -54,28 +170,13 @@ def admin_main(db_connector):
 
             if not pending_users.empty:
                 st.info(f"You have **{len(pending_users)}** user(s) to approve.")
-                
-                for index, user in pending_users.iterrows():
-                    with st.container(border=True):
-                        st.write(f"**Name:** {user['FullName']}")
-                        st.text(f"Phone: {user['Phone(login)']}")
-                        st.text(f"Email: {user.get('Email', 'N/A')}")
-                        
-                        if st.button("Approve User", key=f"approve_{user['Phone(login)']}"):
-                            try:
-                                cell = user_sheet.find(str(user['Phone(login)']))
-                                headers = user_sheet.row_values(1)
-                                status_col_index = headers.index('Status') + 1
-                                user_sheet.update_cell(cell.row, status_col_index, 'Approved')
-                                st.success(f"Approved {user['FullName']}!")
-                                st.cache_data.clear()
-                                st.rerun()
-                            except gspread.exceptions.CellNotFound:
-                                st.error(f"Could not find user with phone {user['Phone(login)']} in the sheet to approve.")
-                            except ValueError:
-                                st.error("Critical error: Could not find the 'Status' column header in the Users sheet.")
-                            except Exception as e:
-                                st.error(f"An error occurred while approving: {e}")
+                to_approve = approval_queue(
+                    pending_users, 'Phone(login)',
+                    ['FullName', 'Phone(login)', 'Email', 'CollegeName', 'Branch', 'Role'],
+                    ['FullName', 'Phone(login)', 'Email'], 'CollegeName', "user_approval",
+                )
+                if to_approve:
+                    approve(user_sheet, 'Phone(login)', to_approve, 'Status', "user(s)")
             else:
                 st.success("No users are currently waiting for approval. Great job! ✅")
         else:
@@ -97,27 +198,13 @@ def admin_main(db_connector):
 
             if not pending_seminars.empty:
                 st.info(f"You have **{len(pending_seminars)}** seminar(s) to approve.")
-
-                for index, seminar in pending_seminars.iterrows():
-                    with st.container(border=True):
-                        st.write(f"**Seminar:** {seminar['Seminar_Event_Name']}")
-                        st.text(f"Domain: {seminar.get('Domain', 'N/A')}")
-                        
-                        if st.button("Approve Seminar", key=f"approve_seminar_{seminar['Seminar_Event_Name']}"):
-                            try:
-                                cell = seminar_sheet.find(seminar['Seminar_Event_Name'])
-                                headers = seminar_sheet.row_values(1)
-                                status_col_index = headers.index('Approved_Status') + 1
-                                seminar_sheet.update_cell(cell.row, status_col_index, 'Approved')
-                                st.success(f"Approved seminar: {seminar['Seminar_Event_Name']}!")
-                                st.cache_data.clear()
-                                st.rerun()
-                            except gspread.exceptions.CellNotFound:
-                                st.error(f"Could not find the seminar in the sheet to approve.")
-                            except ValueError:
-                                st.error("Critical error: Could not find the 'Approved_Status' column header in the sheet.")
-                            except Exception as e:
-                                st.error(f"An error occurred while approving the seminar: {e}")
+                to_approve = approval_queue(
+                    pending_seminars, 'Seminar_Event_Name',
+                    ['Seminar_Event_Name', 'Event_Date', 'Domain', 'Organizer_Name'],
+                    ['Seminar_Event_Name', 'Organizer_Name'], 'Domain', "seminar_approval",
+                )
+                if to_approve:
+                    approve(seminar_sheet, 'Seminar_Event_Name', to_approve, 'Approved_Status', "seminar(s)")
             else:
                 st.success("No seminars are currently waiting for approval. ✅")
         else:
@@ -148,33 +235,65 @@ def admin_main(db_connector):
                 with st.form(key="update_seminar_form"):
                     updated_values = {}
                     for col_name in seminars_df.columns:
-                        updated_values[col_name] = st.text_input(
-                            f"{col_name}",
-                            value=str(seminar_data.get(col_name, ""))
+                        updated_values[col_name] = record_field(
+                            col_name, seminar_data.get(col_name, ""), key=f"seminar_update_{selected_topic}_{col_name}"
                         )
 
                     submit_button = st.form_submit_button("Update Seminar Details")
 
                     if submit_button:
-                        try:
-                            cell = seminar_sheet.find(selected_topic)
-                            if not cell:
-                                st.error(f"Could not find the seminar '{selected_topic}' in the sheet to update.")
-                                return
-
-                            sheet_row_number = cell.row
-                            new_row_data = [updated_values[col] for col in seminars_df.columns]
-                            
-                            seminar_sheet.update(f"A{sheet_row_number}", [new_row_data])
-                            
-                            st.success(f"Successfully updated '{selected_topic}'!")
-                            st.cache_data.clear()
+                        # Only the cells that differ from the snapshot row are written, in one batched call
+                        changes = diff_record(seminar_data, updated_values)
+                        if not changes:
+                            st.info("No changes to save.")
+                        # Located through the 'Seminar_Event_Name' row index built from the snapshot; no find() scan
+                        elif db_connector.update_record(seminar_sheet, 'Seminar_Event_Name', selected_topic, changes):
+                            st.success(f"Updated {len(changes)} field(s) of '{selected_topic}': {', '.join(changes)}.")
                             st.rerun()
-
-                        except gspread.exceptions.CellNotFound:
-                            st.error(f"Could not find the seminar '{selected_topic}' in the sheet to update.")
-                        except Exception as e:
-                            st.error(f"An error occurred while updating the seminar: {e}")
         else:
             st.warning("Could not load seminar data or 'Seminar_Event_Name' column not found.")
 
+    # --- Shared Data Snapshots (one copy per worksheet, shared by every session) ---
+    with st.expander("🗄️ Shared Data Snapshots"):
+        snapshot_rows, snapshot_counters = db_connector.snapshot_report()
+        if snapshot_rows:
+            st.dataframe(pd.DataFrame(snapshot_rows), use_container_width=True)
+            st.caption(
+                f"Hits: {snapshot_counters['hits']} · Misses: {snapshot_counters['misses']} · "
+                f"Shared refreshes: {snapshot_counters['shared_waits']} · "
+                f"Memory: {snapshot_counters['total_bytes'] / 1024:.1f} KiB"
+            )
+        else:
+            st.info("No shared snapshots are loaded.")
+
+        # What each write or refresh evicted: only the entries tagged with the sheet it touched
+        invalidations, cache_counters = db_connector.invalidation_report()
+        if cache_counters:
+            st.caption(
+                f"Tagged cache: {cache_counters['entries']} entries · Hits: {cache_counters['hits']} · "
+                f"Misses: {cache_counters['misses']} · Invalidations: {cache_counters['invalidations']} · "
+                f"Evictions: {cache_counters['evictions']}"
+            )
+        if invalidations:
+            st.dataframe(pd.DataFrame(invalidations), use_container_width=True, hide_index=True)
+
+        # Appends the write-behind queue gave up on after its last retry (secret cells blanked)
+        dead_letters, outbox = db_connector.outbox_report()
+        if outbox:
+            st.caption(
+                f"Outbox: {outbox['pending']} pending · {outbox['flushed']} flushed · "
+                f"{outbox['failures']} failed flushes · {outbox['dead_letters']} dead-lettered"
+            )
+        if dead_letters:
+            st.warning(f"{outbox['dead_letters']} queued row(s) could not be written and were set aside.")
+            st.dataframe(pd.DataFrame(dead_letters), use_container_width=True, hide_index=True)
+
+        # The credentials and keep-alive pool outlive every data refresh
+        session = db_connector.session_metrics()
+        if session:
+            st.caption(
+                f"Token refreshes: {session['token_refreshes']} (failed: {session['refresh_failures']}) · "
+                f"Token valid for {session['token_seconds_left'] // 60} min · "
+                f"HTTP requests: {session['requests']} over {session['connections_opened']} connection(s), "
+                f"{session['connections_reused']} reused"
+            )
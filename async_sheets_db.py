@@ -0,0 +1,265 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import httpx
+from google.auth.transport.requests import Request
+from gspread.utils import extract_id_from_url
+
+from request_scheduler import get_scheduler, is_outage
+from sheet_schema import APPEND_MOSTLY_WORKSHEETS, frame_from_values
+from snapshot_store import DRIVE_FILES_URL
+
+SHEETS_VALUES_BATCH_URL = "https://sheets.googleapis.com/v4/spreadsheets/{}/values:batchGet"
+
+
+class _EventLoopThread:
+    """A long-lived event loop on a daemon thread, so Streamlit's script threads can run coroutines."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="sheets-async-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+
+_LOOP = None
+_LOOP_LOCK = threading.Lock()
+
+
+def run_sync(coro):
+    """Runs a coroutine on the shared background loop and returns its result (the sync facade)."""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = _EventLoopThread()
+    return _LOOP.run(coro)
+
+
+class _KnownRevision:
+    """A revision source that answers with a revision that was already probed."""
+
+    def __init__(self, revision):
+        self.revision = revision
+
+    def get_revision(self, spreadsheet_key):
+        return self.revision
+
+
+class _SharedBatch:
+    """One values batch for a spreadsheet, sent by the first caller that needs any of its ranges."""
+
+    def __init__(self, connector, loop, spreadsheet_key, ranges):
+        self.connector = connector
+        self.loop = loop
+        self.spreadsheet_key = spreadsheet_key
+        self.ranges = ranges
+        self._future = None
+        self._lock = threading.Lock()
+
+    def future(self):
+        """Returns the concurrent future of the batch, sending the request on the first call."""
+        with self._lock:
+            if self._future is None:
+                self._future = asyncio.run_coroutine_threadsafe(
+                    self.connector.values_batch_get(self.spreadsheet_key, self.ranges), self.loop
+                )
+            return self._future
+
+    def values(self, a1_range):
+        """Returns one range's values; blocks until the batch has arrived, so never call it on the loop before it has."""
+        return self.future().result()[self.ranges.index(a1_range)]
+
+
+class AsyncSheetsConnector:
+    """Async Sheets reads over one pooled keep-alive HTTP client, sharing the sync connector's caches.
+
+    Independent reads are gathered concurrently, so a page waits for the slowest
+    fetch instead of the sum of all fetches. Calls still go through the process-wide
+    quota scheduler and are retried with its backoff.
+    """
+
+    def __init__(self, creds, snapshots, on_values=None, max_connections=20, token_provider=None, delta_sync=None):
+        self.creds = creds
+        # Returns a valid access token; the sync connector's session manager refreshes tokens ahead of expiry.
+        self.token_provider = token_provider
+        self.snapshots = snapshots
+        # Called as on_values(spreadsheet_key, worksheet_name, values) for every whole sheet fetched.
+        self.on_values = on_values
+        # Called as delta_sync(spreadsheet_key, worksheet_name) for append-mostly sheets; returns the
+        # previous snapshot plus the new rows, or None when a full reload is needed.
+        self.delta_sync = delta_sync
+        self.scheduler = get_scheduler()
+        self.max_connections = max_connections
+        self._client = None
+        self._token_lock = threading.Lock()
+        # In-flight batch requests, touched only on the loop thread
+        self._batches = {}
+        # Snapshot refreshes block on the store's single-flight future, so they wait here and not on the loop.
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="sheets-async-fetch")
+
+    def _http(self):
+        # Created lazily on the loop thread, which the client is bound to.
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    def _token(self):
+        if self.token_provider is not None:
+            return self.token_provider()
+        with self._token_lock:
+            if not self.creds.valid:
+                self.creds.refresh(Request())
+            return self.creds.token
+
+    async def _get_json(self, kind, url, params):
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            await loop.run_in_executor(None, self.scheduler.acquire, kind)
+            token = await loop.run_in_executor(None, self._token)
+            try:
+                response = await self._http().get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPStatusError as e:
+                delay = self.scheduler.backoff_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def get_revision(self, spreadsheet_key):
+        """Probes a spreadsheet's Drive version, reusing a recent probe when there is one."""
+        revision = self.snapshots.cached_revision(spreadsheet_key)
+        if revision is None:
+            metadata = await self._get_json(
+                'drive', DRIVE_FILES_URL.format(spreadsheet_key),
+                {"fields": "version,modifiedTime", "supportsAllDrives": "true"},
+            )
+            revision = metadata.get("version") or metadata.get("modifiedTime")
+            self.snapshots.record_revision(spreadsheet_key, revision)
+        return revision
+
+    async def values_batch_get(self, spreadsheet_key, ranges):
+        """Fetches several A1 ranges of one spreadsheet in a single request; identical in-flight requests share it."""
+        coalesce_key = ('batch', spreadsheet_key) + tuple(ranges)
+        task = self._batches.get(coalesce_key)
+        if task is None:
+            task = asyncio.ensure_future(self._values_batch_get(spreadsheet_key, ranges))
+            self._batches[coalesce_key] = task
+            task.add_done_callback(lambda _: self._batches.pop(coalesce_key, None))
+        else:
+            self.scheduler.record_coalesced()
+        return await asyncio.shield(task)
+
+    async def _values_batch_get(self, spreadsheet_key, ranges):
+        data = await self._get_json(
+            'read', SHEETS_VALUES_BATCH_URL.format(quote(spreadsheet_key)), [("ranges", r) for r in ranges]
+        )
+        return [value_range.get("values", []) for value_range in data.get("valueRanges", [])]
+
+    def _offline_frames(self, spreadsheet_key, targets):
+        """Serves whole-sheet targets from their last snapshots, or returns None if any is missing."""
+        frames = {}
+        for target, worksheet_name, a1_range in targets:
+            snapshot = self.snapshots.serve_offline(spreadsheet_key, worksheet_name) if a1_range is None else None
+            if snapshot is None:
+                return None
+            frames[target] = snapshot.frame()
+        return frames
+
+    async def _load_spreadsheet(self, spreadsheet_key, targets):
+        """Loads the targets of one spreadsheet, falling back to the last snapshots if the API is down."""
+        if self.snapshots.offline(spreadsheet_key):
+            frames = self._offline_frames(spreadsheet_key, targets)
+            if frames is not None:
+                return frames
+        try:
+            return await self._fetch_spreadsheet(spreadsheet_key, targets)
+        except Exception as e:
+            frames = self._offline_frames(spreadsheet_key, targets) if is_outage(e) else None
+            if frames is None:
+                raise
+            self.snapshots.go_offline(spreadsheet_key)
+            return frames
+
+    def _fetch_sheet(self, spreadsheet_key, worksheet_name, batch):
+        """fetch() for the snapshot store; runs on a worker thread, not on the loop.
+
+        Append-mostly worksheets with a previous snapshot only fetch their new rows; the rest
+        take their values from the spreadsheet's shared batch.
+        """
+        if self.delta_sync is not None and worksheet_name in APPEND_MOSTLY_WORKSHEETS:
+            df = self.delta_sync(spreadsheet_key, worksheet_name)
+            if df is not None:
+                return df
+        a1_range = f"'{worksheet_name}'"
+        if a1_range in batch.ranges:
+            values = batch.values(a1_range)
+        else:
+            values = asyncio.run_coroutine_threadsafe(
+                self.values_batch_get(spreadsheet_key, [a1_range]), batch.loop
+            ).result()[0]
+        if self.on_values:
+            self.on_values(spreadsheet_key, worksheet_name, values)
+        return frame_from_values(values, worksheet_name)
+
+    async def _fetch_spreadsheet(self, spreadsheet_key, targets):
+        """Loads the targets of one spreadsheet: valid snapshots first, the rest in one shared batch.
+
+        Whole-sheet misses are refreshed through the snapshot store, so sessions missing the
+        same worksheet at the same time share one fetch.
+        """
+        loop = asyncio.get_running_loop()
+        revision = _KnownRevision(await self.get_revision(spreadsheet_key))
+        frames, sheet_misses, range_targets = {}, [], []
+        for target, worksheet_name, a1_range in targets:
+            if a1_range is not None:
+                range_targets.append((target, worksheet_name, f"'{worksheet_name}'!{a1_range}"))
+                continue
+            df, _ = self.snapshots.lookup(spreadsheet_key, worksheet_name, revision)
+            if df is not None:
+                frames[target] = df
+            else:
+                sheet_misses.append((target, worksheet_name))
+
+        # Append-mostly sheets with a previous snapshot are delta-synced, so they stay out of the batch.
+        batch = _SharedBatch(self, loop, spreadsheet_key, [
+            f"'{name}'" for _, name in sheet_misses
+            if self.delta_sync is None or name not in APPEND_MOSTLY_WORKSHEETS
+            or self.snapshots.peek_snapshot(spreadsheet_key, name) is None
+        ] + [a1_range for _, _, a1_range in range_targets])
+        snapshots = await asyncio.gather(*(
+            loop.run_in_executor(
+                self._executor, self.snapshots.get_snapshot, spreadsheet_key, name,
+                functools.partial(self._fetch_sheet, spreadsheet_key, name, batch), revision,
+            )
+            for _, name in sheet_misses
+        ))
+        for (target, _), snapshot in zip(sheet_misses, snapshots):
+            frames[target] = snapshot.frame()
+        if range_targets:
+            await asyncio.wrap_future(batch.future())
+            for target, name, a1_range in range_targets:
+                frames[target] = frame_from_values(batch.values(a1_range), name)
+        return frames
+
+    async def get_dataframes(self, targets):
+        """Loads (sheet_url, worksheet_name[, a1_range]) targets, one concurrent batch per spreadsheet."""
+        groups = {}
+        for target in targets:
+            a1_range = target[2] if len(target) > 2 else None
+            groups.setdefault(extract_id_from_url(target[0]), []).append((target, target[1], a1_range))
+        results = await asyncio.gather(*(self._load_spreadsheet(key, group) for key, group in groups.items()))
+        frames = {}
+        for result in results:
+            frames.update(result)
+        return frames
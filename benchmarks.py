@@ -0,0 +1,92 @@
+"""Offline micro-benchmarks for the data layer. Run with: python benchmarks.py"""
+import random
+import time
+
+import pandas as pd
+from gspread.utils import numericise_all, to_records
+
+from login_index import LoginIndex
+from sheet_schema import USERS_HEADERS, frame_from_values
+
+
+def make_users_values(n_rows, seed=0):
+    """Generates a get_all_values()-style grid for a Users sheet with n_rows users."""
+    rng = random.Random(seed)
+    rows = [USERS_HEADERS]
+    for i in range(n_rows):
+        row = {
+            'FullName': f"User {i}", 'CollegeName': rng.choice(["PES", "RVCE", "BMS", "MSRIT"]),
+            'Branch': rng.choice(["CSE", "ECE", "ISE"]), 'RollNO(UniversityRegNo)': f"1XX{i:06d}",
+            'YearofPassing_Passed': str(rng.randint(2020, 2027)), 'Phone(login)': str(9000000000 + i),
+            'Phone(Whatsapp)': f" {9000000000 + i} ", 'Email': f"user{i}@example.com", 'Password': f"pw{i}",
+            'Status': rng.choice(["Approved", "Not Approved"]), 'Role': rng.choice(["Student", "Lead", "Organizer"]),
+            'Experience': "", 'Brief_Presentor': "", 'LinkedinProfile': "", 'Github_Profile': "",
+            'Area_of_Interest': rng.choice(["AI", "ML", "Web Dev"]),
+        }
+        rows.append([row[h] for h in USERS_HEADERS])
+    return rows
+
+
+def _records_path(values):
+    """The previous path: get_all_records() dicts, then the per-view normalization."""
+    records = to_records(values[0], [numericise_all(row) for row in values[1:]])
+    df = pd.DataFrame(records)
+    df['Phone(login)'].astype(str).str.strip()
+    df['Phone(Whatsapp)'].astype(str).str.strip()
+    df['Status'].astype(str).str.strip()
+    return df
+
+
+def _typed_path(values):
+    """The current path: one typed, vectorized pass over the raw grid."""
+    return frame_from_values(values, 'Users')
+
+
+def _best_of(fn, values, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(values)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def bench_ingestion(sizes=(10_000, 100_000)):
+    """Compares get_all_records-based ingestion with the typed get_all_values path."""
+    print("Users sheet ingestion (best of 3)")
+    for n_rows in sizes:
+        values = make_users_values(n_rows)
+        old = _best_of(_records_path, values)
+        new = _best_of(_typed_path, values)
+        print(f"  {n_rows:>7} rows: records {old * 1000:8.1f} ms | typed {new * 1000:8.1f} ms | {old / new:4.1f}x")
+
+
+def bench_login_storm(n_users=100_000, attempts=200, seed=1):
+    """Times a burst of login attempts: per-attempt column filtering vs one prebuilt phone index."""
+    df = frame_from_values(make_users_values(n_users), 'Users')
+    rng = random.Random(seed)
+    # Mostly registered users, with some unknown numbers mixed in
+    phones = [str(9000000000 + rng.randrange(int(n_users * 1.1))) for _ in range(attempts)]
+
+    started = time.perf_counter()
+    for phone in phones:
+        record = df[df['Phone(login)'].astype(str).str.strip() == phone.strip()]
+        if not record.empty:
+            record.iloc[0]
+    filtered = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index = LoginIndex(df)
+    built = time.perf_counter() - started
+    for phone in phones:
+        index.lookup(phone)
+    indexed = time.perf_counter() - started
+
+    print(f"Login storm: {attempts} attempts against {n_users} users")
+    print(f"  filter per attempt {filtered * 1000:8.1f} ms | index {indexed * 1000:8.1f} ms "
+          f"(build {built * 1000:.1f} ms) | {filtered / indexed:4.1f}x")
+
+
+if __name__ == "__main__":
+    bench_ingestion()
+    bench_login_storm()
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from login_index import normalize_phones
+from prefetch import ENROLLMENT_WORKSHEET_NAME
+from snapshot_store import cached_by_snapshot
+
+CANDIDATE_COLUMNS = ['Presentor_FullName', 'Phone(login)', 'Email']
+
+# Each worker holds one enrollment-sheet read; the scheduler still enforces the per-minute quotas.
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="enrollment-rollup")
+
+
+def _load_enrollments(db_connector, link):
+    """Loads one event's enrollment sheet; runs on the roll-up pool, so it only uses Streamlit-free calls."""
+    worksheet = db_connector.open_worksheet(link, ENROLLMENT_WORKSHEET_NAME)
+    if worksheet is None:
+        raise LookupError(f"No '{ENROLLMENT_WORKSHEET_NAME}' tab")
+    return db_connector.get_dataframe(worksheet)
+
+
+def load_enrollment_frames(db_connector, events):
+    """Loads the enrollment sheets of several (event name, sheet link) pairs concurrently.
+
+    Returns {event name: DataFrame} and {event name: error message} for the sheets that failed.
+    """
+    futures = {name: _EXECUTOR.submit(_load_enrollments, db_connector, link) for name, link in events}
+    frames, errors = {}, {}
+    for name, future in futures.items():
+        try:
+            frames[name] = future.result()
+        except Exception as e:
+            errors[name] = str(e) or type(e).__name__
+    return frames, errors
+
+
+class CandidateRollup:
+    """Every candidate enrolled in a set of events, once, with the events each one joined.
+
+    Candidates are keyed by their normalized login phone, or by their lower-cased email
+    when the phone is blank; rows with neither are left out.
+    """
+
+    def __init__(self, frames, errors=None):
+        self.errors = dict(errors or {})
+        pieces = []
+        for name, df in frames.items():
+            if df.empty:
+                continue
+            pieces.append(pd.DataFrame({
+                column: (df[column].astype(str).str.strip() if column in df.columns else "")
+                for column in CANDIDATE_COLUMNS
+            }).assign(Event=name))
+        if not pieces:
+            self.candidates = pd.DataFrame(columns=CANDIDATE_COLUMNS + ['Events_Count', 'Events'])
+            self.per_event = pd.DataFrame(columns=['Event', 'Enrollments', 'Candidates', 'Also_In_Other_Events'])
+            return
+
+        rows = pd.concat(pieces, ignore_index=True)
+        phone = normalize_phones(rows['Phone(login)'])
+        email = rows['Email'].str.lower()
+        rows['_key'] = phone.where(phone != "", "email:" + email)
+        rows = rows[(phone != "") | (email != "")]
+        enrollments = rows.groupby('Event', sort=False).size()
+
+        # One row per candidate per event, then one row per candidate
+        rows = rows.drop_duplicates(['_key', 'Event'])
+        grouped = rows.groupby('_key', sort=False)
+        self.candidates = grouped.agg(
+            Presentor_FullName=('Presentor_FullName', 'first'),
+            Phone=('Phone(login)', 'first'),
+            Email=('Email', 'first'),
+            Events_Count=('Event', 'size'),
+            Events=('Event', ", ".join),
+        ).rename(columns={'Phone': 'Phone(login)'}).sort_values('Events_Count', ascending=False, kind="stable")
+        self.candidates = self.candidates.reset_index(drop=True)
+
+        repeat = rows['_key'].map(grouped.size()) > 1
+        self.per_event = pd.DataFrame({
+            'Enrollments': enrollments,
+            'Candidates': rows.groupby('Event', sort=False).size(),
+            'Also_In_Other_Events': repeat.groupby(rows['Event'], sort=False).sum(),
+        }).reindex(list(frames)).fillna(0).astype(int).rename_axis('Event').reset_index()
+
+    def __len__(self):
+        return len(self.candidates)
+
+
+def get_candidate_rollup(db_connector, events):
+    """Returns the roll-up of the events' enrollment sheets, rebuilt only when one of them has a new snapshot.
+
+    The sheets are re-read through the shared snapshots, so an unchanged event costs a
+    revision probe at most, and an unchanged set of events reuses the merged tables.
+    """
+    frames, errors = load_enrollment_frames(db_connector, tuple(events))
+    if errors:
+        return CandidateRollup(frames, errors)
+    return cached_by_snapshot('candidate_rollup', frames, CandidateRollup)
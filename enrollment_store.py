@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from login_index import normalize_phone, normalize_phones
+from snapshot_store import cached_by_snapshot
+
+ENROLLMENTS_WORKSHEET_NAME = "Enrollments"
+
+
+class EnrollmentIndex:
+    """user -> seminars and seminar -> users maps over one Enrollments snapshot.
+
+    Users are keyed by their normalized login phone. An enrollment written twice (e.g. a
+    double click from two tabs) counts once.
+    """
+
+    def __init__(self, df):
+        self._by_user = {}
+        self._by_seminar = {}
+        if 'Phone(login)' not in df.columns or 'Seminar_Event_Name' not in df.columns:
+            return
+        phones = normalize_phones(df['Phone(login)'])
+        seminars = df['Seminar_Event_Name'].astype(str).str.strip()
+        for phone, seminar in zip(phones, seminars):
+            if phone and seminar:
+                self._by_user.setdefault(phone, set()).add(seminar)
+                self._by_seminar.setdefault(seminar, set()).add(phone)
+
+    def seminars_for(self, phone):
+        """Returns the names of the seminars a user is enrolled in."""
+        return frozenset(self._by_user.get(normalize_phone(phone), ()))
+
+    def users_for(self, seminar):
+        """Returns the login phones of the users enrolled in a seminar."""
+        return frozenset(self._by_seminar.get(str(seminar).strip(), ()))
+
+    def is_enrolled(self, phone, seminar):
+        return str(seminar).strip() in self._by_user.get(normalize_phone(phone), ())
+
+    def count(self, seminar):
+        """Returns how many users are enrolled in a seminar."""
+        return len(self._by_seminar.get(str(seminar).strip(), ()))
+
+    def __len__(self):
+        return sum(len(seminars) for seminars in self._by_user.values())
+
+
+def get_enrollment_index(df):
+    """Returns the enrollment index for a worksheet's frame, rebuilt only when its snapshot changes."""
+    return cached_by_snapshot('enrollments', df, EnrollmentIndex)
+
+
+def enroll(db_connector, worksheet, index, phone, full_name, seminar):
+    """Records an enrollment unless the user already has it; returns True if a row was written.
+
+    Rows go through enqueue_record, so clicks from every session are coalesced into one
+    batched append by the write-behind queue, and the session reads its own enrollment back.
+    """
+    if index.is_enrolled(phone, seminar):
+        return False
+    row = [normalize_phone(phone), full_name, str(seminar).strip(), datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
+    return db_connector.enqueue_record(worksheet, row)
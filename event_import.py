@@ -0,0 +1,118 @@
+import io
+
+import pandas as pd
+
+from sheet_schema import SEMINAR_HEADERS
+from snapshot_store import cached_by_snapshot
+
+# Filled in the same way as the "Create New Event" form
+REQUIRED_COLUMNS = ['Event_Date', 'Seminar_Event_Name', 'Domain', 'BriefDescription']
+LINK_COLUMNS = [
+    'External_URL', 'WhatsappLink', 'Meet_session_Link', 'Seminar_GuestLecture_Sheet_Link',
+    'Seminar Evaluation-GoogleFormLink',
+]
+# Set by the app, whatever the file says: new events always wait for an admin's approval.
+APP_COLUMNS = {'Approved_Status': "Not Approved", 'Organizer_Name': None}
+DEFAULT_VALUES = {'Status': "Upcoming"}
+
+
+def normalize_event_name(name):
+    """Event names are compared case-insensitively with runs of whitespace collapsed."""
+    return " ".join(str(name).split()).lower()
+
+
+class EventNameIndex:
+    """The normalized Seminar_Event_Name set of one seminar list snapshot."""
+
+    def __init__(self, df):
+        if 'Seminar_Event_Name' in df.columns:
+            self._names = set(df['Seminar_Event_Name'].map(normalize_event_name))
+        else:
+            self._names = set()
+        self._names.discard("")
+
+    def __contains__(self, name):
+        return normalize_event_name(name) in self._names
+
+    def __len__(self):
+        return len(self._names)
+
+
+def get_event_name_index(df):
+    """Returns the event name index for a seminar list frame, rebuilt only when its snapshot changes."""
+    return cached_by_snapshot('event_names', df, EventNameIndex)
+
+
+def read_event_file(name, data):
+    """Reads an uploaded .csv or .xlsx file into a frame of text cells (blank cells become "")."""
+    if name.lower().endswith(".xlsx"):
+        # Raises ImportError when openpyxl is not installed
+        df = pd.read_excel(io.BytesIO(data), dtype=str, engine="openpyxl")
+    else:
+        df = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    df.columns = [str(column).strip() for column in df.columns]
+    return df.fillna("")
+
+
+class ImportPlan:
+    """The dry run of a bulk import: the rows that would be appended and a per-row report.
+
+    Row numbers in the report are the spreadsheet rows of the uploaded file (its header is row 1).
+    """
+
+    def __init__(self, upload_df, name_index, organizer_name):
+        self.file_errors = []
+        self.rows = []
+        report = []
+
+        unknown = [column for column in upload_df.columns if column not in SEMINAR_HEADERS]
+        missing = [column for column in REQUIRED_COLUMNS if column not in upload_df.columns]
+        if unknown:
+            self.file_errors.append(f"Unknown columns: {', '.join(unknown)}")
+        if missing:
+            self.file_errors.append(f"Missing required columns: {', '.join(missing)}")
+        if self.file_errors:
+            self.report = pd.DataFrame(columns=['Row', 'Seminar_Event_Name', 'Result', 'Problems'])
+            return
+
+        upload_df = upload_df.reindex(columns=SEMINAR_HEADERS, fill_value="")
+        upload_df = upload_df.apply(lambda column: column.astype(str).str.strip())
+        dates = pd.to_datetime(upload_df['Event_Date'], errors='coerce', format='mixed')
+        seen = set()
+        for position, record in enumerate(upload_df.to_dict('records')):
+            problems = [f"{column} is required" for column in REQUIRED_COLUMNS if not record[column]]
+            if record['Event_Date'] and pd.isna(dates.iloc[position]):
+                problems.append(f"Event_Date '{record['Event_Date']}' is not a date")
+            for column in LINK_COLUMNS:
+                if record[column] and not record[column].lower().startswith(("http://", "https://")):
+                    problems.append(f"{column} is not a link")
+            name = normalize_event_name(record['Seminar_Event_Name'])
+            if name and record['Seminar_Event_Name'] in name_index:
+                problems.append("An event with this name already exists")
+            elif name and name in seen:
+                problems.append("Duplicate of an earlier row in this file")
+            seen.add(name)
+
+            report.append({
+                'Row': position + 2,
+                'Seminar_Event_Name': record['Seminar_Event_Name'],
+                'Result': "Error" if problems else "Ready",
+                'Problems': "; ".join(problems),
+            })
+            if problems:
+                continue
+            record['Event_Date'] = dates.iloc[position].strftime("%Y-%m-%d")
+            for column, value in DEFAULT_VALUES.items():
+                record[column] = record[column] or value
+            record.update({column: value if value is not None else organizer_name for column, value in APP_COLUMNS.items()})
+            self.rows.append([record[column] for column in SEMINAR_HEADERS])
+        self.report = pd.DataFrame(report, columns=['Row', 'Seminar_Event_Name', 'Result', 'Problems'])
+
+    @property
+    def error_count(self):
+        return int((self.report['Result'] == "Error").sum())
+
+
+def template_csv():
+    """Returns an empty CSV with the columns a bulk import file can use."""
+    return pd.DataFrame(columns=[c for c in SEMINAR_HEADERS if c not in APP_COLUMNS]).to_csv(index=False).encode("utf-8")
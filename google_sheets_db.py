@@ -1,37 +1,187 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
 import streamlit as st
 import gspread
-from google.oauth2.service_account import Credentials
+from gspread.utils import extract_id_from_url, rowcol_to_a1
 import pandas as pd
 
-class GoogleSheetsConnector:
+from async_sheets_db import AsyncSheetsConnector, run_sync
+from sheet_schema import APPEND_MOSTLY_WORKSHEETS, SECRET_COLUMNS, WORKSHEET_HEADERS, apply_schema, frame_from_values
+from request_scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, get_scheduler
+from session_manager import get_session_manager
+from snapshot_store import DiskSnapshotCache, DriveRevisionSource, SnapshotStore
+from tagged_cache import get_tagged_cache
+from storage_backend import StorageBackend
+from write_queue import get_write_queue
+
+
+class HandleCache:
+    """A thread-safe, bounded LRU cache of gspread handles shared by every session."""
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._client_id = None
+        self.hits = 0
+        self.misses = 0
+
+    def bind(self, client):
+        """Drops every handle if they were opened with a different gspread client."""
+        with self._lock:
+            if self._client_id != id(client):
+                self._entries.clear()
+                self._client_id = id(client)
+
+    def get(self, key):
+        with self._lock:
+            handle = self._entries.get(key)
+            if handle is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return handle
+
+    def put(self, key, handle):
+        with self._lock:
+            self._entries[key] = handle
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, spreadsheet_key=None, worksheet_name=None):
+        """Removes matching handles; with no arguments the whole cache is cleared."""
+        with self._lock:
+            for key in list(self._entries):
+                if spreadsheet_key is not None and key[0] != spreadsheet_key:
+                    continue
+                if worksheet_name is not None and key[1] != worksheet_name:
+                    continue
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# --- Process-wide handle caches, keyed by (spreadsheet key, worksheet title) ---
+_SPREADSHEET_CACHE = HandleCache(maxsize=32)
+_WORKSHEET_CACHE = HandleCache(maxsize=128)
+
+# --- Process-wide write-path caches: header maps and lookup-value -> row indexes, each tagged with a sheet revision ---
+_HEADER_MAPS = {}
+_ROW_INDEXES = {}
+_WRITE_CACHE_LOCK = threading.Lock()
+
+# --- Process-wide snapshot store shared by every session, revalidated against Drive revisions ---
+# Snapshots are also persisted to SNAPSHOT_CACHE_DIR, for fast restarts and read-only service during API outages;
+# worksheets holding SECRET_COLUMNS (Users, Admins) are kept in memory only.
+SNAPSHOT_CACHE_DIR = ".snapshot_cache"
+_SNAPSHOTS = SnapshotStore(disk=DiskSnapshotCache(SNAPSHOT_CACHE_DIR, secret_columns=SECRET_COLUMNS))
+
+# --- Process-wide async connector: concurrent reads over one pooled keep-alive HTTP client ---
+_ASYNC_CONNECTOR = None
+_ASYNC_LOCK = threading.Lock()
+
+# --- Incremental sync state for append-mostly sheets: row count and a checksum of the tail ---
+_SYNC_STATE = {}
+_SYNC_LOCK = threading.Lock()
+SYNC_TAIL_ROWS = 3
+FULL_RELOAD_INTERVAL = 600  # seconds; also catches in-place edits made outside this app
+
+
+def _rows_checksum(rows):
+    return hashlib.sha1(json.dumps(rows).encode("utf-8")).hexdigest()
+
+# --- Every API call goes through the process-wide quota-aware scheduler ---
+_SCHEDULER = get_scheduler()
+
+
+def worksheet_cache_key(worksheet):
+    """Returns the (spreadsheet key, worksheet title) pair that identifies a worksheet."""
+    return (worksheet.spreadsheet_id, worksheet.title)
+
+
+def _is_stale_handle(error):
+    """True for the errors a cached handle raises once its tab was renamed, deleted or re-created."""
+    if isinstance(error, gspread.exceptions.WorksheetNotFound):
+        return True
+    # The handle's old title no longer names a tab, so its A1 ranges do not parse.
+    return (
+        isinstance(error, gspread.exceptions.APIError)
+        and getattr(error, 'code', None) == 400
+        and "range" in str(error).lower()
+    )
+
+
+class GoogleSheetsConnector(StorageBackend):
     """A class to interact with Google Sheets."""
 
     def __init__(self):
-        self.creds = self._get_credentials()
-        self.client = self._get_client()
+        super().__init__()
+        self.sessions = self._get_session_manager()
+        self.creds = self.sessions.credentials if self.sessions else None
+        self.client = self.sessions.client if self.sessions else None
+        self.revision_source = DriveRevisionSource(self.client, scheduler=_SCHEDULER) if self.client else None
+        if self.client:
+            _SPREADSHEET_CACHE.bind(self.client)
+            _WORKSHEET_CACHE.bind(self.client)
+            # Rows left in the outbox by a previous process are flushed without waiting for a new write.
+            if get_write_queue().pending_count():
+                self._start_flusher()
 
-    @st.cache_resource
-    def _get_credentials(_self):
-        """Get credentials from Streamlit secrets."""
+    def _get_session_manager(self):
+        """Gets the process-wide credentials and pooled HTTP session, built from Streamlit secrets."""
         try:
-            scopes = [
-                "https://www.googleapis.com/auth/spreadsheets",
-                "https://www.googleapis.com/auth/drive"
-            ]
-            return Credentials.from_service_account_info(
-                st.secrets["gcp_service_account"],
-                scopes=scopes,
-            )
+            return get_session_manager(st.secrets["gcp_service_account"])
         except Exception as e:
             st.error(f"Failed to load credentials: {e}")
             return None
 
-    @st.cache_resource
-    def _get_client(_self):
-        """Get the gspread client, authorized with credentials."""
-        if _self.creds:
-            return gspread.authorize(_self.creds)
-        return None
+    def session_metrics(self):
+        """Returns token-refresh and connection-reuse counts of the shared HTTP session."""
+        return self.sessions.stats() if self.sessions else {}
+
+    # --- Scheduled API calls ---
+    def _read(self, fn, coalesce_key=None):
+        """Runs a read call through the scheduler; identical in-flight reads share one call."""
+        return _SCHEDULER.call('read', fn, coalesce_key=coalesce_key)
+
+    def _write(self, fn):
+        """Runs a write call through the scheduler; writes default to the interactive lane."""
+        priority = _SCHEDULER.priority
+        return _SCHEDULER.call('write', fn, priority=PRIORITY_INTERACTIVE if priority is None else priority)
+
+    def request_metrics(self):
+        """Returns the scheduler's queue depth, wait-time and retry metrics."""
+        return _SCHEDULER.metrics()
+
+    def _open_spreadsheet(self, spreadsheet_key):
+        spreadsheet = _SPREADSHEET_CACHE.get((spreadsheet_key, None))
+        if spreadsheet is None:
+            spreadsheet = self._read(
+                lambda: self.client.open_by_key(spreadsheet_key), coalesce_key=('open', spreadsheet_key)
+            )
+            _SPREADSHEET_CACHE.put((spreadsheet_key, None), spreadsheet)
+        return spreadsheet
+
+    def _open_worksheet(self, spreadsheet_key, worksheet_name):
+        cache_key = (spreadsheet_key, worksheet_name)
+        worksheet = _WORKSHEET_CACHE.get(cache_key)
+        if worksheet is None:
+            spreadsheet = self._open_spreadsheet(spreadsheet_key)
+            worksheet = self._read(lambda: spreadsheet.worksheet(worksheet_name), coalesce_key=('open',) + cache_key)
+            _WORKSHEET_CACHE.put(cache_key, worksheet)
+        return worksheet
+
+    def get_spreadsheet(self, sheet_url):
+        """Gets a Google Sheet by URL, reusing a cached handle when possible."""
+        return self._open_spreadsheet(extract_id_from_url(sheet_url))
 
     def get_worksheet(self, sheet_url, worksheet_name):
         """Gets a specific worksheet (tab) from a Google Sheet."""
@@ -39,8 +189,9 @@ class GoogleSheetsConnector:
             st.error("Gspread client not initialized. Check credentials.")
             return None
         try:
-            spreadsheet = self.client.open_by_url(sheet_url)
-            return spreadsheet.worksheet(worksheet_name)
+            return self._open_worksheet(extract_id_from_url(sheet_url), worksheet_name)
+        except gspread.exceptions.NoValidUrlKeyFound:
+            st.error(f"Invalid Google Sheets URL: {sheet_url}")
         except gspread.exceptions.SpreadsheetNotFound:
             st.error(f"Spreadsheet not found at URL: {sheet_url}")
         except gspread.exceptions.WorksheetNotFound:
@@ -49,45 +200,500 @@ class GoogleSheetsConnector:
             st.error(f"An error occurred while accessing the sheet: {e}")
         return None
 
+    def open_worksheet(self, sheet_url, worksheet_name):
+        """Opens a worksheet through the handle cache without calling st.*; None if the tab does not exist."""
+        if not self.client:
+            raise RuntimeError("Gspread client not initialized. Check credentials.")
+        try:
+            return self._open_worksheet(extract_id_from_url(sheet_url), worksheet_name)
+        except gspread.exceptions.WorksheetNotFound:
+            return None
+
+    def get_or_create_worksheet(self, sheet_url, worksheet_name):
+        """Gets a worksheet, adding the tab with its declared header row if the spreadsheet does not have it yet."""
+        if not self.client:
+            st.error("Gspread client not initialized. Check credentials.")
+            return None
+        spreadsheet_key = extract_id_from_url(sheet_url)
+        try:
+            return self._open_worksheet(spreadsheet_key, worksheet_name)
+        except gspread.exceptions.WorksheetNotFound:
+            pass
+        except Exception as e:
+            st.error(f"An error occurred while accessing the sheet: {e}")
+            return None
+
+        headers = WORKSHEET_HEADERS.get(worksheet_name)
+        if not headers:
+            st.error(f"Worksheet '{worksheet_name}' not found in the spreadsheet.")
+            return None
+        try:
+            spreadsheet = self._open_spreadsheet(spreadsheet_key)
+            worksheet = self._write(lambda: spreadsheet.add_worksheet(worksheet_name, rows=1, cols=len(headers)))
+            self._write(lambda: worksheet.append_row(headers))
+            _WORKSHEET_CACHE.put((spreadsheet_key, worksheet_name), worksheet)
+            get_tagged_cache().invalidate(spreadsheet_key, None, reason="add worksheet")
+            return worksheet
+        except Exception as e:
+            # Another session may have added the tab first
+            try:
+                return self._open_worksheet(spreadsheet_key, worksheet_name)
+            except Exception:
+                st.error(f"Could not create the '{worksheet_name}' worksheet: {e}")
+                return None
+
+    def invalidate_worksheet(self, sheet_url=None, worksheet_name=None):
+        """Forgets cached handles and their write caches, e.g. after a tab is renamed, deleted or re-shared."""
+        spreadsheet_key = extract_id_from_url(sheet_url) if sheet_url else None
+        _WORKSHEET_CACHE.invalidate(spreadsheet_key, worksheet_name)
+        if worksheet_name is None:
+            _SPREADSHEET_CACHE.invalidate(spreadsheet_key)
+        with _WRITE_CACHE_LOCK:
+            for cache in (_HEADER_MAPS, _ROW_INDEXES):
+                for key in list(cache):
+                    if (spreadsheet_key is None or key[0] == spreadsheet_key) and (worksheet_name is None or key[1] == worksheet_name):
+                        del cache[key]
+
+    def _with_fresh_handle(self, worksheet, call):
+        """Returns call(worksheet), reopening the tab by name and retrying once if the cached handle is stale.
+
+        A handle keeps the title it was opened with, so after its tab is renamed, deleted or
+        re-created every request through it fails until it is dropped from the cache.
+        """
+        try:
+            return call(worksheet)
+        except Exception as e:
+            if not _is_stale_handle(e):
+                raise
+        spreadsheet_key, worksheet_name = worksheet_cache_key(worksheet)
+        _WORKSHEET_CACHE.invalidate(spreadsheet_key, worksheet_name)
+        self.invalidate_write_caches(worksheet, headers=True)
+        return call(self._open_worksheet(spreadsheet_key, worksheet_name))
+
     def get_dataframe(self, worksheet):
-        """Converts a worksheet into a pandas DataFrame."""
+        """Converts a worksheet into a pandas DataFrame, including rows still in the write-behind queue."""
         if worksheet:
-            return pd.DataFrame(worksheet.get_all_records())
+            self.trace(worksheet.title, 'read')
+            df = _SNAPSHOTS.get(
+                worksheet.spreadsheet_id,
+                worksheet.title,
+                fetch=lambda: self._with_fresh_handle(worksheet, self._fetch_frame),
+                revision_source=self.revision_source,
+            )
+            return self._overlay_pending_rows(worksheet, df)
         return pd.DataFrame()
 
+    def _fetch_frame(self, worksheet):
+        """Fetches a worksheet's frame, syncing only the new rows of append-mostly sheets."""
+        if worksheet.title in APPEND_MOSTLY_WORKSHEETS:
+            previous = _SNAPSHOTS.peek(worksheet.spreadsheet_id, worksheet.title)
+            if previous is not None:
+                df = self._delta_sync(worksheet, previous)
+                if df is not None:
+                    return df
+        values = self._read(worksheet.get_all_values, coalesce_key=('values',) + worksheet_cache_key(worksheet))
+        self._remember_sync_state(worksheet_cache_key(worksheet), values)
+        return frame_from_values(values, worksheet.title)
+
+    def _remember_sync_state(self, cache_key, values):
+        """Records the row count and tail checksum of a fully loaded grid."""
+        width = len(values[0]) if values else 0
+        tail = [(list(row) + [""] * width)[:width] for row in values[1:][-SYNC_TAIL_ROWS:]]
+        with _SYNC_LOCK:
+            _SYNC_STATE[cache_key] = {
+                'headers': values[0] if values else [],
+                'row_count': len(values),
+                'tail_rows': len(tail),
+                'checksum': _rows_checksum(tail),
+                'full_at': time.monotonic(),
+            }
+
+    def _delta_sync(self, worksheet, previous):
+        """Appends rows added below the last seen row; returns None when a full reload is needed."""
+        with _SYNC_LOCK:
+            state = dict(_SYNC_STATE.get(worksheet_cache_key(worksheet)) or {})
+        if not state.get('headers') or time.monotonic() - state['full_at'] > FULL_RELOAD_INTERVAL:
+            return None
+        width = len(state['headers'])
+        start = state['row_count'] - state['tail_rows'] + 1
+        last_col = re.sub(r"\d", "", rowcol_to_a1(1, width))
+        window = self._read(lambda: worksheet.get_values(f"A{start}:{last_col}"))
+        window = [(list(row) + [""] * width)[:width] for row in window]
+
+        # The previously seen tail must be unchanged, otherwise rows were edited or deleted.
+        tail, new_rows = window[:state['tail_rows']], window[state['tail_rows']:]
+        if len(tail) != state['tail_rows'] or _rows_checksum(tail) != state['checksum']:
+            return None
+        state['row_count'] += len(new_rows)
+        state['tail_rows'] = min(SYNC_TAIL_ROWS, len(window))
+        state['checksum'] = _rows_checksum(window[-state['tail_rows']:] if state['tail_rows'] else [])
+        with _SYNC_LOCK:
+            _SYNC_STATE[worksheet_cache_key(worksheet)] = state
+        if not new_rows:
+            return previous
+        new_df = frame_from_values([state['headers']] + new_rows, worksheet.title)
+        return apply_schema(pd.concat([previous, new_df], ignore_index=True), worksheet.title)
+
+    def _delta_sync_by_key(self, spreadsheet_key, worksheet_name):
+        """Delta-syncs a worksheet's last snapshot for the async connector; None if there is none or it needs a full reload."""
+        previous = _SNAPSHOTS.peek(spreadsheet_key, worksheet_name)
+        if previous is None:
+            return None
+        return self._with_fresh_handle(
+            self._open_worksheet(spreadsheet_key, worksheet_name), lambda worksheet: self._delta_sync(worksheet, previous)
+        )
+
+    def async_connector(self):
+        """Returns the process-wide async connector (one pooled HTTP client) for these credentials."""
+        global _ASYNC_CONNECTOR
+        with _ASYNC_LOCK:
+            if _ASYNC_CONNECTOR is None or _ASYNC_CONNECTOR.creds is not self.creds:
+                _ASYNC_CONNECTOR = AsyncSheetsConnector(
+                    self.creds, _SNAPSHOTS, token_provider=self.sessions.token,
+                    on_values=lambda key, name, values: self._remember_sync_state((key, name), values),
+                    delta_sync=self._delta_sync_by_key,
+                )
+            return _ASYNC_CONNECTOR
+
+    def get_dataframes(self, targets):
+        """Loads several worksheets: one values batch per spreadsheet, all spreadsheets concurrently.
+
+        targets is a list of (sheet_url, worksheet_name) or (sheet_url, worksheet_name, a1_range)
+        tuples; the result maps each target tuple to its DataFrame. Whole-sheet targets are
+        served from the shared snapshots when their spreadsheet has not changed.
+        """
+        for target in targets:
+            self.trace(target[1], 'read')
+        frames = run_sync(self.async_connector().get_dataframes(targets))
+        for target in targets:
+            if len(target) < 3 or target[2] is None:
+                frames[target] = self._overlay_target(target[0], target[1], frames[target])
+        return frames
+
+    def _overlay_target(self, sheet_url, worksheet_name, df):
+        """Overlays queued rows on a frame loaded by URL, opening the worksheet only if needed."""
+        if not get_write_queue().pending_rows(extract_id_from_url(sheet_url), worksheet_name):
+            return df
+        worksheet = self.get_worksheet(sheet_url, worksheet_name)
+        return self._overlay_pending_rows(worksheet, df) if worksheet else df
+
+    def _mark_appended(self, spreadsheet_key, worksheet_name):
+        """Appends keep append-mostly snapshots valid for a delta sync; others are dropped."""
+        if worksheet_name in APPEND_MOSTLY_WORKSHEETS:
+            snapshots = _SNAPSHOTS.mark_stale(spreadsheet_key, worksheet_name)
+        else:
+            snapshots = _SNAPSHOTS.invalidate(spreadsheet_key, worksheet_name)
+        get_tagged_cache().invalidate(spreadsheet_key, worksheet_name, reason="append", snapshots=snapshots)
+
+    def snapshot_report(self):
+        """Returns per-snapshot memory and version details plus store hit/miss counters."""
+        return _SNAPSHOTS.report()
+
+    def invalidate_snapshots(self, sheet_url=None, worksheet_name=None):
+        """Forces the next read of the matching worksheets (and whatever was cached from them) to fetch fresh values.
+
+        Their handles are reopened too, so a Refresh also picks up renamed or re-created tabs.
+        """
+        self.invalidate_worksheet(sheet_url, worksheet_name)
+        spreadsheet_key = extract_id_from_url(sheet_url) if sheet_url else None
+        snapshots = _SNAPSHOTS.invalidate(spreadsheet_key, worksheet_name)
+        get_tagged_cache().invalidate(spreadsheet_key, worksheet_name, reason="refresh", snapshots=snapshots)
+
+    def is_offline(self):
+        """True while a spreadsheet is unreachable and its reads come from the last saved snapshots."""
+        return _SNAPSHOTS.offline()
+
+    # --- Write-behind appends ---
+    def _flush_rows(self, spreadsheet_key, worksheet_name, rows):
+        """Called by the write-behind flusher with every queued row for one worksheet."""
+        with _SCHEDULER.lane(PRIORITY_BACKGROUND):
+            self._with_fresh_handle(
+                self._open_worksheet(spreadsheet_key, worksheet_name),
+                lambda worksheet: self._write(lambda: worksheet.append_rows(rows)),
+            )
+
+    def _start_flusher(self):
+        # Snapshots are refreshed only after the rows left the outbox, so they are never overlaid twice.
+        get_write_queue().start(self._flush_rows, on_flushed=self._mark_appended)
+
+    def enqueue_record(self, worksheet, row_data):
+        """Queues a row for a batched background append and returns immediately."""
+        try:
+            self.trace(worksheet.title, 'append')
+            queue = get_write_queue()
+            queue.enqueue(worksheet.spreadsheet_id, worksheet.title, row_data)
+            self._start_flusher()
+            return True
+        except Exception as e:
+            st.error(f"Failed to queue record: {e}")
+            return False
+
+    def outbox_report(self):
+        """Returns the rows the write-behind queue gave up on (secrets blanked) and its counters."""
+        return get_write_queue().report()
+
+    def _overlay_pending_rows(self, worksheet, df):
+        """Appends queued-but-unwritten rows so a session reads its own writes."""
+        pending = get_write_queue().pending_rows(worksheet.spreadsheet_id, worksheet.title)
+        if not pending:
+            return df
+        headers = list(df.columns) if not df.empty else list(self.get_header_map(worksheet))
+        pending_df = pd.DataFrame(
+            [(row + [""] * len(headers))[:len(headers)] for row in pending], columns=headers
+        )
+        merged = pd.concat([df, pending_df], ignore_index=True)
+        # Keeps the snapshot version, so indexes keyed on (version, row count) see the overlay.
+        merged.attrs = dict(df.attrs)
+        return apply_schema(merged, worksheet.title)
+
     def add_record(self, worksheet, row_data):
         """Appends a new row of data to the worksheet."""
         try:
-            worksheet.append_row(row_data)
+            self.trace(worksheet.title, 'append')
+            self._with_fresh_handle(worksheet, lambda ws: self._write(lambda: ws.append_row(row_data)))
+            self._mark_appended(worksheet.spreadsheet_id, worksheet.title)
             return True
         except Exception as e:
             st.error(f"Failed to add record: {e}")
             return False
 
+    def add_records(self, worksheet, rows):
+        """Appends several rows with a single append_rows call; raises if the write fails."""
+        if not rows:
+            return
+        self.trace(worksheet.title, 'append')
+        self._with_fresh_handle(worksheet, lambda ws: self._write(lambda: ws.append_rows(rows)))
+        self._mark_appended(worksheet.spreadsheet_id, worksheet.title)
+
     def append_record(self, worksheet, row_data):
         """Appends a new row of data to the worksheet. Alias for add_record."""
         try:
-            worksheet.append_row(row_data)
+            self.trace(worksheet.title, 'append')
+            self._with_fresh_handle(worksheet, lambda ws: self._write(lambda: ws.append_row(row_data)))
+            self._mark_appended(worksheet.spreadsheet_id, worksheet.title)
             return True
         except Exception as e:
             st.error(f"Failed to add record: {e}")
             return False
 
-    def update_record(self, worksheet, lookup_col, lookup_val, update_data):
-        """Updates a specific record in the worksheet."""
+    def _probe_revision(self, worksheet):
+        """Returns the spreadsheet's current revision (one shared probe), or None if it cannot be read."""
         try:
-            # Headers are in the first row
-            headers = worksheet.row_values(1)
-            # Find the column index for the lookup column
-            lookup_col_index = headers.index(lookup_col) + 1
-            cell = worksheet.find(str(lookup_val), in_column=lookup_col_index)
-            row_index = cell.row
-            for col_name, new_val in update_data.items():
-                col_index = headers.index(col_name) + 1
-                worksheet.update_cell(row_index, col_index, new_val)
+            return _SNAPSHOTS.current_revision(worksheet.spreadsheet_id, self.revision_source)
+        except Exception:
+            return None
+
+    def get_header_map(self, worksheet, refresh=False):
+        """Returns the {column name: 1-based column index} map for the worksheet.
+
+        The map is reused only while the spreadsheet's revision is unchanged; after any edit
+        (e.g. a column inserted or moved), or when the revision cannot be probed, row 1 is re-read.
+        """
+        cache_key = worksheet_cache_key(worksheet)
+        revision = self._probe_revision(worksheet)
+        with _WRITE_CACHE_LOCK:
+            entry = None if refresh else _HEADER_MAPS.get(cache_key)
+        if entry is not None and revision is not None and entry['revision'] == revision:
+            return entry['columns']
+        headers = self._read(lambda: worksheet.row_values(1))
+        header_map = {}
+        for col_index, name in enumerate(headers, start=1):
+            header_map.setdefault(name, col_index)
+        with _WRITE_CACHE_LOCK:
+            _HEADER_MAPS[cache_key] = {'columns': header_map, 'revision': revision}
+        return header_map
+
+    def _row_index_entry(self, worksheet, lookup_col, refresh=False):
+        """Returns the cached {'rows', 'version', 'revision'} index entry for one lookup column.
+
+        The index is built from the worksheet's shared snapshot when one is loaded (no API
+        call) and rebuilt when a newer snapshot is published; otherwise, or with refresh,
+        it is built from one column fetch. 'revision' is the sheet revision it reflects.
+        """
+        cache_key = worksheet_cache_key(worksheet) + (lookup_col,)
+        latest = _SNAPSHOTS.peek_snapshot(*worksheet_cache_key(worksheet))
+        snapshot = None if refresh else latest
+        if snapshot is not None and lookup_col not in snapshot.frame().columns:
+            snapshot = None
+        with _WRITE_CACHE_LOCK:
+            entry = None if refresh else _ROW_INDEXES.get(cache_key)
+        if entry is not None and (snapshot is None or entry['version'] == snapshot.version):
+            return entry
+        if snapshot is not None:
+            column, version, revision = snapshot.frame()[lookup_col].tolist(), snapshot.version, snapshot.revision
+        else:
+            col_index = self.get_header_map(worksheet)[lookup_col]
+            revision = self._probe_revision(worksheet)
+            # Row 1 holds the headers.
+            column = self._read(lambda: worksheet.col_values(col_index))[1:]
+            # Tied to the current snapshot's version, so the same (outdated) snapshot is not re-indexed.
+            version = latest.version if latest is not None else None
+            if refresh and latest is not None:
+                _SNAPSHOTS.mark_stale(*worksheet_cache_key(worksheet))
+        row_index = {}
+        # Snapshot rows are sheet rows 2, 3, ...; keep the first match like worksheet.find does.
+        for row_number, value in enumerate(column, start=2):
+            row_index.setdefault(str(value).strip(), row_number)
+        entry = {'rows': row_index, 'version': version, 'revision': revision}
+        with _WRITE_CACHE_LOCK:
+            _ROW_INDEXES[cache_key] = entry
+        return entry
+
+    def get_row_index(self, worksheet, lookup_col, refresh=False):
+        """Returns a cached {lookup value: sheet row number} map for one lookup column."""
+        return self._row_index_entry(worksheet, lookup_col, refresh)['rows']
+
+    def invalidate_write_caches(self, worksheet, headers=False):
+        """Drops the cached row indexes (and optionally the header map) for a worksheet."""
+        cache_key = worksheet_cache_key(worksheet)
+        with _WRITE_CACHE_LOCK:
+            for key in [key for key in _ROW_INDEXES if key[:2] == cache_key]:
+                del _ROW_INDEXES[key]
+            if headers:
+                _HEADER_MAPS.pop(cache_key, None)
+
+    def _verify_row(self, worksheet, lookup_col, lookup_key, row_number, revision):
+        """Checks that an indexed row still holds its key before it is written to.
+
+        Free when the sheet's revision still matches the index; otherwise a single-cell read.
+        """
+        if revision is not None and self._probe_revision(worksheet) == revision:
             return True
-        except (gspread.exceptions.CellNotFound, ValueError, AttributeError):
+        col_index = self.get_header_map(worksheet)[lookup_col]
+        value = self._read(lambda: worksheet.cell(row_number, col_index).value)
+        return str(value or "").strip() == lookup_key
+
+    def _locate_row(self, worksheet, lookup_col, lookup_val):
+        """Resolves the sheet row of a record, rebuilding the index once on a miss or drift."""
+        lookup_key = str(lookup_val).strip()
+        entry = self._row_index_entry(worksheet, lookup_col)
+        row_number = entry['rows'].get(lookup_key)
+        if row_number is not None and self._verify_row(worksheet, lookup_col, lookup_key, row_number, entry['revision']):
+            return row_number
+        return self._row_index_entry(worksheet, lookup_col, refresh=True)['rows'].get(lookup_key)
+
+    def _lookup_header_map(self, worksheet, lookup_col):
+        """Returns the header map, refreshed once if the lookup column is missing, or None."""
+        header_map = self.get_header_map(worksheet)
+        if lookup_col not in header_map:
+            header_map = self.get_header_map(worksheet, refresh=True)
+        if lookup_col not in header_map:
+            st.error(f"Column '{lookup_col}' was not found in the sheet headers.")
+            return None
+        return header_map
+
+    def _cell_writes(self, header_map, row_number, update_data):
+        """Turns one record's {column: value} changes into per-cell results and batch_update ranges."""
+        results, data = [], []
+        for col_name, new_val in update_data.items():
+            result = {'column': col_name, 'cell': None, 'value': new_val, 'updated': False}
+            results.append(result)
+            if col_name not in header_map:
+                result['error'] = "Unknown column"
+                continue
+            result['cell'] = rowcol_to_a1(row_number, header_map[col_name])
+            data.append({'range': result['cell'], 'values': [[new_val]]})
+        return results, data
+
+    def _apply_cell_writes(self, worksheet, data, results):
+        """Sends every range in one batch_update call and marks the results that were written."""
+        response = self._write(lambda: worksheet.batch_update(data, raw=False))
+        updated_ranges = {r.get('updatedRange', '').split('!')[-1] for r in response.get('responses', [])}
+        for result in results:
+            if result['cell'] is not None:
+                result['updated'] = result['cell'] in updated_ranges
+        # An in-place edit: the next read of this sheet is a full reload.
+        snapshots = _SNAPSHOTS.invalidate(worksheet.spreadsheet_id, worksheet.title)
+        get_tagged_cache().invalidate(worksheet.spreadsheet_id, worksheet.title, reason="update", snapshots=snapshots)
+
+    def _update_record_cells(self, worksheet, lookup_col, lookup_val, update_data):
+        """Locates one record and writes its changed cells; see batch_update_record."""
+        header_map = self._lookup_header_map(worksheet, lookup_col)
+        if header_map is None:
+            return None
+
+        row_number = self._locate_row(worksheet, lookup_col, lookup_val)
+        if row_number is None:
             st.error(f"Could not find record where {lookup_col} is {lookup_val}.")
+            return None
+
+        results, data = self._cell_writes(header_map, row_number, update_data)
+        if data:
+            self._apply_cell_writes(worksheet, data, results)
+        return results
+
+    def batch_update_record(self, worksheet, lookup_col, lookup_val, update_data):
+        """Writes every changed cell of one record in a single batch_update call.
+
+        Returns a list of per-cell results ({'column', 'cell', 'value', 'updated'}),
+        or None if the record could not be located or the request failed.
+        """
+        try:
+            self.trace(worksheet.title, 'update')
+            return self._with_fresh_handle(
+                worksheet, lambda ws: self._update_record_cells(ws, lookup_col, lookup_val, update_data)
+            )
         except Exception as e:
             st.error(f"Failed to update record: {e}")
-        return False
+            # Rows may have moved; rebuild the index on the next write.
+            self.invalidate_write_caches(worksheet, headers=True)
+        return None
+
+    def _locate_rows(self, worksheet, lookup_col, lookup_vals):
+        """Resolves many records' rows at once: one revision probe, or one key-column fetch if it changed."""
+        keys = [str(val).strip() for val in lookup_vals]
+        entry = self._row_index_entry(worksheet, lookup_col)
+        current = entry['revision'] is not None and self._probe_revision(worksheet) == entry['revision']
+        if not current or any(key not in entry['rows'] for key in keys):
+            entry = self._row_index_entry(worksheet, lookup_col, refresh=True)
+        return {val: entry['rows'].get(key) for val, key in zip(lookup_vals, keys)}
+
+    def _update_records_cells(self, worksheet, lookup_col, updates):
+        """Locates many records and writes all their changed cells; see update_records."""
+        header_map = self._lookup_header_map(worksheet, lookup_col)
+        if header_map is None:
+            return None
+
+        rows = self._locate_rows(worksheet, lookup_col, list(updates))
+        missing = [str(val) for val, row_number in rows.items() if row_number is None]
+        if missing:
+            st.error(f"Could not find records where {lookup_col} is: {', '.join(missing)}.")
+
+        record_results, data = {}, []
+        for lookup_val, update_data in updates.items():
+            if rows[lookup_val] is None:
+                continue
+            record_results[lookup_val], record_data = self._cell_writes(header_map, rows[lookup_val], update_data)
+            data.extend(record_data)
+        if data:
+            self._apply_cell_writes(
+                worksheet, data, [result for results in record_results.values() for result in results]
+            )
+        return {
+            lookup_val: lookup_val in record_results and all(r['updated'] for r in record_results[lookup_val])
+            for lookup_val in updates
+        }
+
+    def update_records(self, worksheet, lookup_col, updates):
+        """Applies {lookup value: {column: value}} to many records in a single batch_update call.
+
+        Returns {lookup value: True if every cell of that record was written}, or None on failure.
+        """
+        try:
+            self.trace(worksheet.title, 'update')
+            return self._with_fresh_handle(worksheet, lambda ws: self._update_records_cells(ws, lookup_col, updates))
+        except Exception as e:
+            st.error(f"Failed to update records: {e}")
+            self.invalidate_write_caches(worksheet, headers=True)
+        return None
+
+    def update_record(self, worksheet, lookup_col, lookup_val, update_data):
+        """Updates a specific record in the worksheet."""
+        results = self.batch_update_record(worksheet, lookup_col, lookup_val, update_data)
+        if results is None:
+            return False
+        failed = [r['column'] for r in results if not r['updated']]
+        if failed:
+            st.error(f"Some fields were not updated: {', '.join(failed)}.")
+            return False
+        return True
@@ -0,0 +1,57 @@
+import re
+
+import pandas as pd
+
+from snapshot_store import cached_by_snapshot
+
+LOGIN_COLUMN = 'Phone(login)'
+
+# Spaces, dashes and brackets are ignored when phone numbers are compared.
+_PHONE_NOISE = r"[\s\-()]"
+
+
+def normalize_phone(value):
+    """Normalizes a phone number the way it is compared at login: no spaces, dashes or brackets."""
+    return re.sub(_PHONE_NOISE, "", str(value))
+
+
+def normalize_phones(values):
+    """normalize_phone for a whole Series, in one vectorized pass."""
+    return values.astype(str).str.replace(_PHONE_NOISE, "", regex=True)
+
+
+class LoginIndex:
+    """A normalized phone -> row map over one Users/Admins frame, for O(1) login lookups.
+
+    Like the DataFrame filter it replaces, the first row with a given phone number wins.
+    """
+
+    def __init__(self, df, key_column=LOGIN_COLUMN):
+        self._df = df
+        if key_column not in df.columns:
+            self._positions = {}
+            return
+        keys = normalize_phones(df[key_column]).tolist()
+        # Built back to front so the first occurrence of a key is the one kept.
+        self._positions = dict(zip(reversed(keys), range(len(keys) - 1, -1, -1)))
+
+    def lookup(self, phone):
+        """Returns the record (a Series) registered with this phone number, or None."""
+        position = self._positions.get(normalize_phone(phone))
+        return self._df.iloc[position] if position is not None else None
+
+    def records(self, phone):
+        """Returns the record registered with this phone number as a one-row frame, empty if there is none."""
+        position = self._positions.get(normalize_phone(phone))
+        return self._df.iloc[[position] if position is not None else []]
+
+    def __contains__(self, phone):
+        return normalize_phone(phone) in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+
+def get_login_index(df):
+    """Returns the login index of a Users/Admins frame, shared until the worksheet's snapshot changes."""
+    return cached_by_snapshot('login', df if df is not None else pd.DataFrame(), LoginIndex)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from snapshot_store import cached_by_snapshot
+
+
+class OrganizerIndex:
+    """An Organizer_Name -> Approved_Status -> rows map over one seminar list snapshot.
+
+    An organizer's events, optionally narrowed to one approval status, and their
+    status breakdown are dictionary lookups instead of a column filter per tab.
+    """
+
+    def __init__(self, df):
+        self._df = df
+        self._groups = {}
+        if 'Organizer_Name' not in df.columns:
+            return
+        keys = pd.DataFrame({
+            'organizer': df['Organizer_Name'].astype(str).str.strip().to_numpy(),
+            'status': (
+                df['Approved_Status'].astype(str).str.strip().to_numpy()
+                if 'Approved_Status' in df.columns else np.full(len(df), "")
+            ),
+        })
+        for (organizer, status), positions in keys.groupby(['organizer', 'status'], sort=False).indices.items():
+            self._groups.setdefault(organizer, {})[status] = positions
+
+    def events(self, organizer, status=None):
+        """Returns the organizer's events (in sheet order), optionally only those with one Approved_Status."""
+        by_status = self._groups.get(str(organizer or "").strip(), {})
+        if status is not None:
+            positions = by_status.get(status, np.array([], dtype=np.int64))
+        elif by_status:
+            positions = np.sort(np.concatenate(list(by_status.values())))
+        else:
+            positions = np.array([], dtype=np.int64)
+        return self._df.iloc[positions]
+
+    def breakdown(self, organizer):
+        """Returns {Approved_Status: number of events} for the organizer."""
+        by_status = self._groups.get(str(organizer or "").strip(), {})
+        return {status: len(positions) for status, positions in by_status.items()}
+
+
+def get_organizer_index(df):
+    """Returns the organizer index for a seminar list frame, rebuilt only when its snapshot changes."""
+    return cached_by_snapshot('organizers', df, OrganizerIndex)
@@ -1,22 +1,31 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from candidate_rollup import get_candidate_rollup
+from event_import import ImportPlan, get_event_name_index, read_event_file, template_csv
+from organizer_index import get_organizer_index
 
 def organizer_main(db_connector):
     """The main function for the Organizer Dashboard page."""
     st.header("📝 Organizer Dashboard")
 
+    # Define constants for Google Sheets
+    SEMINAR_SHEET_URL = "https://docs.google.com/spreadsheets/d/1EeuqOzuc90owGbTZTp7XNJObYkFc9gzbG_v-Mko78mc/edit?usp=sharing"
+    SEMINAR_WORKSHEET_NAME = "Seminar_Guest_Event_List"
+    USER_DATA_URL = "https://docs.google.com/spreadsheets/d/1nJq-DCS-bGMqtaVvU9VImWhOEet5uuL-uQHcMKBgSss/edit?usp=sharing"
+
     # --- Add Refresh Button ---
     if st.button("🔄 Refresh Data"):
-        # Clear the cache for the database connection and worksheets
-        st.cache_resource.clear()
+        # Drop only the seminar list's snapshot and what was cached from it; credentials and the client stay
+        db_connector.invalidate_snapshots(SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME)
         st.success("Data has been refreshed!")
         st.rerun() # Rerun the app to fetch the latest data
 
-    # Define constants for Google Sheets
-    SEMINAR_SHEET_URL = "https://docs.google.com/spreadsheets/d/1EeuqOzuc90owGbTZTp7XNJObYkFc9gzbG_v-Mko78mc/edit?usp=sharing"
-    SEMINAR_WORKSHEET_NAME = "Seminar_Guest_Event_List"
-    USER_DATA_URL = "https://docs.google.com/spreadsheets/d/1nJq-DCS-bGMqtaVvU9VImWhOEet5uuL-uQHcMKBgSss/edit?usp=sharing"
+    # --- One snapshot per render, shared by every tab, plus the Organizer_Name index built from it ---
+    seminar_sheet = db_connector.get_worksheet(SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME)
+    seminars_df = db_connector.get_dataframe(seminar_sheet) if seminar_sheet else pd.DataFrame()
+    organizer_index = get_organizer_index(seminars_df)
+    organizer_events = organizer_index.events(st.session_state.user_name)
     
     # Create tabs for different functionalities
     tab1, tab2, tab3, tab4 = st.tabs([
@@ -45,7 +54,6 @@ def organizer_main(db_connector):
                 if not all([event_name, event_date, domain, description]):
                     st.warning("Please fill in all required fields.")
                 else:
-                    seminar_sheet = db_connector.get_worksheet(SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME)
                     if seminar_sheet:
                         new_seminar_data = [
                             event_date.strftime("%Y-%m-%d"),
@@ -63,7 +71,7 @@ def organizer_main(db_connector):
                             st.session_state.user_name # Organizer_Name
                         ]
                         try:
-                            success = db_connector.add_record(seminar_sheet, new_seminar_data)
+                            success = db_connector.enqueue_record(seminar_sheet, new_seminar_data)
                             if success:
                                 st.success(f"Successfully submitted '{event_name}' for approval!")
                             else:
@@ -71,16 +79,58 @@ def organizer_main(db_connector):
                         except Exception as e:
                             st.error(f"An error occurred while creating the event: {e}")
 
+        # --- Bulk import: validate the whole file first, then append every accepted row in one write ---
+        with st.expander("📥 Bulk Import Events from CSV / Excel"):
+            st.caption(
+                "One event per row, with the column names of the template. Approved_Status and "
+                "Organizer_Name are filled in for you; Status defaults to 'Upcoming'."
+            )
+            st.download_button(
+                "Download CSV template", template_csv(), file_name="seminar_events_template.csv", mime="text/csv"
+            )
+            uploaded_file = st.file_uploader("Events file", type=["csv", "xlsx"], key="bulk_import_file")
+            if uploaded_file is not None and seminar_sheet:
+                try:
+                    upload_df = read_event_file(uploaded_file.name, uploaded_file.getvalue())
+                except ImportError:
+                    upload_df = None
+                    st.error("Reading Excel files requires the 'openpyxl' package; upload a CSV instead.")
+                except Exception as e:
+                    upload_df = None
+                    st.error(f"Could not read the file: {e}")
+
+                if upload_df is not None:
+                    plan = ImportPlan(upload_df, get_event_name_index(seminars_df), st.session_state.user_name)
+                    for file_error in plan.file_errors:
+                        st.error(file_error)
+                    if not plan.file_errors:
+                        col1, col2, col3 = st.columns(3)
+                        col1.metric("Rows in File", len(plan.report))
+                        col2.metric("Ready to Import", len(plan.rows))
+                        col3.metric("Rows with Errors", plan.error_count)
+                        st.dataframe(
+                            plan.report[plan.report['Result'] == "Error"] if plan.error_count else plan.report,
+                            use_container_width=True, hide_index=True
+                        )
+                        if plan.error_count and plan.rows:
+                            st.warning("Rows with errors are skipped; fix them and upload the file again to add them.")
+                        if st.button(f"Import {len(plan.rows)} Events", disabled=not plan.rows, key="bulk_import_submit"):
+                            try:
+                                db_connector.add_records(seminar_sheet, plan.rows)
+                                st.success(f"Submitted {len(plan.rows)} events for approval!")
+                            except Exception as e:
+                                st.error(f"Failed to import the events: {e}")
+
     # --- Tab 2: Your Submitted Events ---
     with tab2:
         st.subheader("Events You Have Submitted")
-        seminar_sheet = db_connector.get_worksheet(SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME)
         if seminar_sheet:
-            seminars_df = db_connector.get_dataframe(seminar_sheet)
             if not seminars_df.empty and 'Organizer_Name' in seminars_df.columns:
-                # Filter events created by the current organizer
-                organizer_events = seminars_df[seminars_df['Organizer_Name'] == st.session_state.user_name]
                 if not organizer_events.empty:
+                    # Approval-status breakdown, straight from the index
+                    breakdown = organizer_index.breakdown(st.session_state.user_name)
+                    for status_col, (status, count) in zip(st.columns(len(breakdown)), sorted(breakdown.items())):
+                        status_col.metric(status or "No status", count)
                     st.dataframe(organizer_events)
                 else:
                     st.info("You have not submitted any events yet.")
@@ -90,11 +140,8 @@ def organizer_main(db_connector):
     # --- Tab 3: Update Your Events ---
     with tab3:
         st.subheader("Update an Event You Created")
-        seminar_sheet = db_connector.get_worksheet(SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME)
         if seminar_sheet:
-            seminars_df = db_connector.get_dataframe(seminar_sheet)
             if not seminars_df.empty and 'Organizer_Name' in seminars_df.columns:
-                organizer_events = seminars_df[seminars_df['Organizer_Name'] == st.session_state.user_name]
                 if not organizer_events.empty:
                     event_to_update = st.selectbox(
                         "Select an event to update",
@@ -137,41 +184,68 @@ def organizer_main(db_connector):
     # --- Tab 4: List Candidates per Event ---
     with tab4:
         st.subheader("View Enrolled Candidates for Your Events")
-        seminar_sheet = db_connector.get_worksheet(SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME)
         if seminar_sheet:
-            seminars_df = db_connector.get_dataframe(seminar_sheet)
             if not seminars_df.empty and 'Organizer_Name' in seminars_df.columns and 'Approved_Status' in seminars_df.columns:
                 # --- MODIFIED: Filter logic to check for 'Yes' instead of 'Approved' ---
-                approved_organizer_events = seminars_df[
-                    (seminars_df['Organizer_Name'] == st.session_state.user_name) &
-                    (seminars_df['Approved_Status'] == 'Yes')
-                ]
+                approved_organizer_events = organizer_index.events(st.session_state.user_name, status='Yes')
                 if not approved_organizer_events.empty:
-                    event_to_view = st.selectbox(
-                        "Select an approved event to see enrollments",
-                        options=approved_organizer_events['Seminar_Event_Name'].tolist(),
-                        key="view_enrollments_select"
+                    view_mode = st.radio(
+                        "View", ["One event", "All approved events (roll-up)"],
+                        horizontal=True, key="candidate_view_mode"
                     )
-                    if event_to_view:
-                        event_details = approved_organizer_events[approved_organizer_events['Seminar_Event_Name'] == event_to_view].iloc[0]
-                        enrollment_sheet_link = event_details.get('Seminar_GuestLecture_Sheet_Link')
-
-                        if enrollment_sheet_link and "docs.google.com/spreadsheets" in enrollment_sheet_link:
-                            with st.spinner("Fetching enrollment data..."):
-                                try:
-                                    # --- MODIFIED: Changed worksheet name to 'Seminar_GuestLecture_List' ---
-                                    enrollment_ws = db_connector.get_worksheet(enrollment_sheet_link, "Seminar_GuestLecture_List")
-                                    if enrollment_ws:
-                                        enrollments_df = db_connector.get_dataframe(enrollment_ws)
-                                        st.write(f"**Enrolled Candidates for '{event_to_view}'**")
-                                        st.dataframe(enrollments_df)
-                                    else:
-                                        # --- MODIFIED: Updated warning message ---
-                                        st.warning("Could not access the enrollment worksheet. Check the link and ensure a 'Seminar_GuestLecture_List' tab exists in that sheet.")
-                                except Exception as e:
-                                    st.error(f"Failed to load enrollment data. The link might be incorrect or the sheet structure is not as expected. Error: {e}")
+                    if view_mode == "All approved events (roll-up)":
+                        # Every event's enrollment sheet is loaded in parallel and merged into one candidate table
+                        linked_events = [
+                            (row['Seminar_Event_Name'], row['Seminar_GuestLecture_Sheet_Link'])
+                            for _, row in approved_organizer_events.iterrows()
+                            if "docs.google.com/spreadsheets" in str(row.get('Seminar_GuestLecture_Sheet_Link', ''))
+                        ]
+                        if linked_events:
+                            with st.spinner(f"Fetching enrollment data for {len(linked_events)} events..."):
+                                rollup = get_candidate_rollup(db_connector, linked_events)
+                            col1, col2, col3 = st.columns(3)
+                            col1.metric("Events", len(linked_events))
+                            col2.metric("Enrollments", int(rollup.per_event['Enrollments'].sum()))
+                            col3.metric("Unique Candidates", len(rollup))
+                            for event_name, error in rollup.errors.items():
+                                st.warning(f"Could not load the enrollments of '{event_name}': {error}")
+                            st.write("**Enrollments per Event**")
+                            st.dataframe(rollup.per_event, use_container_width=True, hide_index=True)
+                            st.write("**All Candidates**")
+                            st.dataframe(rollup.candidates, use_container_width=True, hide_index=True)
+                            st.download_button(
+                                "Download candidates (CSV)",
+                                rollup.candidates.to_csv(index=False).encode("utf-8"),
+                                file_name="candidates_rollup.csv", mime="text/csv"
+                            )
                         else:
-                            st.info("No enrollment sheet link provided for this event.")
+                            st.info("None of your approved events has an enrollment sheet link yet.")
+                    else:
+                        event_to_view = st.selectbox(
+                            "Select an approved event to see enrollments",
+                            options=approved_organizer_events['Seminar_Event_Name'].tolist(),
+                            key="view_enrollments_select"
+                        )
+                        if event_to_view:
+                            event_details = approved_organizer_events[approved_organizer_events['Seminar_Event_Name'] == event_to_view].iloc[0]
+                            enrollment_sheet_link = event_details.get('Seminar_GuestLecture_Sheet_Link')
+
+                            if enrollment_sheet_link and "docs.google.com/spreadsheets" in enrollment_sheet_link:
+                                with st.spinner("Fetching enrollment data..."):
+                                    try:
+                                        # --- MODIFIED: Changed worksheet name to 'Seminar_GuestLecture_List' ---
+                                        enrollment_ws = db_connector.get_worksheet(enrollment_sheet_link, "Seminar_GuestLecture_List")
+                                        if enrollment_ws:
+                                            enrollments_df = db_connector.get_dataframe(enrollment_ws)
+                                            st.write(f"**Enrolled Candidates for '{event_to_view}'**")
+                                            st.dataframe(enrollments_df)
+                                        else:
+                                            # --- MODIFIED: Updated warning message ---
+                                            st.warning("Could not access the enrollment worksheet. Check the link and ensure a 'Seminar_GuestLecture_List' tab exists in that sheet.")
+                                    except Exception as e:
+                                        st.error(f"Failed to load enrollment data. The link might be incorrect or the sheet structure is not as expected. Error: {e}")
+                            else:
+                                st.info("No enrollment sheet link provided for this event.")
                 else:
                     st.info("You have no approved events to view candidates for.")
 
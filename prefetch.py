@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from request_scheduler import PRIORITY_BACKGROUND, get_scheduler
+
+ENROLLMENT_WORKSHEET_NAME = "Seminar_GuestLecture_List"
+
+
+def warm_enrollment_sheet(db_connector, link):
+    """Loads an event's enrollment sheet into the shared snapshots, on the background lane."""
+    with get_scheduler().lane(PRIORITY_BACKGROUND):
+        worksheet = db_connector.open_worksheet(link, ENROLLMENT_WORKSHEET_NAME)
+        if worksheet is not None:
+            db_connector.get_dataframe(worksheet)
+
+
+class EnrollmentPrefetcher:
+    """Warms the enrollment sheets of the next upcoming events on a bounded thread pool.
+
+    Scheduling a new list of links cancels the work still queued for the previous list;
+    record_access() counts whether an event's sheet was already warm when it was opened.
+    """
+
+    def __init__(self, max_workers=3, depth=5):
+        self.depth = depth
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="enrollment-prefetch")
+        self._lock = threading.Lock()
+        self._links = ()
+        self._futures = {}
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.cancelled = 0
+
+    def schedule(self, db_connector, links):
+        """Prefetches the first `depth` links; a no-op if the same links are already scheduled."""
+        links = tuple(dict.fromkeys(link for link in links if link and "docs.google.com/spreadsheets" in link))[:self.depth]
+        with self._lock:
+            if links == self._links:
+                return
+            self._cancel_locked()
+            self._links = links
+            for link in links:
+                self._futures[link] = self._executor.submit(self._run, db_connector, link)
+
+    def _run(self, db_connector, link):
+        try:
+            warm_enrollment_sheet(db_connector, link)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+
+    def _cancel_locked(self):
+        for future in self._futures.values():
+            if future.cancel():
+                self.cancelled += 1
+        self._futures = {}
+        self._links = ()
+
+    def cancel(self):
+        """Cancels queued prefetches, e.g. when the events list is refreshed."""
+        with self._lock:
+            self._cancel_locked()
+
+    def record_access(self, link):
+        """Counts a hit if the link's prefetch had already finished successfully, else a miss."""
+        with self._lock:
+            future = self._futures.get(link)
+            if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits, 'misses': self.misses, 'failures': self.failures,
+                'cancelled': self.cancelled, 'scheduled': len(self._links),
+            }
+
+
+_PREFETCHER = None
+_PREFETCHER_LOCK = threading.Lock()
+
+
+def get_prefetcher():
+    """Returns the process-wide enrollment prefetcher."""
+    global _PREFETCHER
+    with _PREFETCHER_LOCK:
+        if _PREFETCHER is None:
+            _PREFETCHER = EnrollmentPrefetcher()
+        return _PREFETCHER
@@ -0,0 +1,220 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import google.auth.exceptions
+import httpx
+
+# --- Priority lanes: lower numbers are served first ---
+PRIORITY_INTERACTIVE = 0   # login, approvals and other user-initiated writes
+PRIORITY_NORMAL = 1        # page reads
+PRIORITY_BACKGROUND = 2    # write-behind flushes, prefetching, revalidation
+
+# Per-minute request quotas, per kind of call. Sheets allows 60 reads and 60 writes
+# per minute per user; Drive metadata probes have a much larger budget.
+DEFAULT_QUOTAS = {'read': 60, 'write': 60, 'drive': 600}
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at per_minute / 60 tokens per second."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        """Takes a token and returns 0, or returns how many seconds until one is available."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def _status_code(error):
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) or getattr(error, 'code', None)
+
+
+def is_outage(error):
+    """True if an error means the API is unreachable or overloaded, not that the request itself was wrong.
+
+    Throttling and 5xx responses, connection failures and timeouts count; a 403, a 404 or
+    a renamed tab do not.
+    """
+    status = _status_code(error)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS_CODES
+    # requests' connection errors and timeouts are OSErrors; httpx and google-auth have their own.
+    return isinstance(error, (OSError, httpx.TransportError, google.auth.exceptions.TransportError))
+
+
+class RequestScheduler:
+    """Throttles API calls to the quotas, serving higher-priority lanes first.
+
+    Identical in-flight reads are coalesced onto one call, and throttled or
+    transiently failing calls are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, quotas=None, max_retries=5, base_delay=1.0, max_delay=32.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets = {kind: TokenBucket(limit) for kind, limit in (quotas or DEFAULT_QUOTAS).items()}
+        self._waiting = {kind: [] for kind in self._buckets}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._inflight = {}
+        self._local = threading.local()
+        self._stats = {
+            'calls': 0, 'coalesced': 0, 'retries': 0, 'throttled': 0,
+            'wait_count': {}, 'wait_total': {}, 'wait_max': {},
+        }
+
+    # --- Priority of the calling thread ---
+    @property
+    def priority(self):
+        return getattr(self._local, 'priority', None)
+
+    @contextmanager
+    def lane(self, priority):
+        """Runs the calls made inside the block at the given priority."""
+        previous = self.priority
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    # --- Admission ---
+    def _acquire(self, kind, priority):
+        started = time.monotonic()
+        ticket = (priority, next(self._sequence))
+        with self._condition:
+            waiting = self._waiting[kind]
+            heapq.heappush(waiting, ticket)
+            while True:
+                if waiting[0] == ticket:
+                    delay = self._buckets[kind].try_take()
+                    if delay == 0:
+                        heapq.heappop(waiting)
+                        self._condition.notify_all()
+                        break
+                    self._condition.wait(delay)
+                else:
+                    self._condition.wait()
+            waited = time.monotonic() - started
+            stats = self._stats
+            stats['wait_count'][priority] = stats['wait_count'].get(priority, 0) + 1
+            stats['wait_total'][priority] = stats['wait_total'].get(priority, 0.0) + waited
+            stats['wait_max'][priority] = max(stats['wait_max'].get(priority, 0.0), waited)
+
+    def acquire(self, kind, priority=None):
+        """Blocks until a token of the given kind is granted; used by callers that issue the request themselves."""
+        if priority is None:
+            priority = self.priority if self.priority is not None else PRIORITY_NORMAL
+        self._acquire(kind, priority)
+
+    def backoff_delay(self, error, attempt):
+        """Returns the jittered delay before retrying a failed call, or None if it should not be retried."""
+        status = _status_code(error)
+        if status not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+            return None
+        with self._condition:
+            self._stats['retries'] += 1
+            if status == 429:
+                self._stats['throttled'] += 1
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _run(self, kind, fn, priority):
+        attempt = 0
+        while True:
+            self._acquire(kind, priority)
+            try:
+                return fn()
+            except Exception as e:
+                delay = self.backoff_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    def call(self, kind, fn, priority=None, coalesce_key=None):
+        """Runs fn() once a token of the given kind is available and returns its result."""
+        if priority is None:
+            priority = self.priority if self.priority is not None else PRIORITY_NORMAL
+        with self._condition:
+            self._stats['calls'] += 1
+            future = self._inflight.get(coalesce_key) if coalesce_key is not None else None
+            if future is not None:
+                self._stats['coalesced'] += 1
+            elif coalesce_key is not None:
+                self._inflight[coalesce_key] = owner = Future()
+        if future is not None:
+            return future.result()
+        if coalesce_key is None:
+            return self._run(kind, fn, priority)
+        try:
+            result = self._run(kind, fn, priority)
+            owner.set_result(result)
+            return result
+        except Exception as e:
+            owner.set_exception(e)
+            raise
+        finally:
+            with self._condition:
+                self._inflight.pop(coalesce_key, None)
+
+    def record_coalesced(self):
+        """Counts a read that joined an identical in-flight call made outside call() (e.g. on the async path)."""
+        with self._condition:
+            self._stats['calls'] += 1
+            self._stats['coalesced'] += 1
+
+    # --- Metrics ---
+    def metrics(self):
+        """Returns queue depths per kind and priority, wait-time statistics and retry counters."""
+        with self._condition:
+            depth = {
+                kind: {p: sum(1 for ticket in waiting if ticket[0] == p) for p in {t[0] for t in waiting}}
+                for kind, waiting in self._waiting.items()
+            }
+            stats = self._stats
+            waits = {
+                priority: {
+                    'count': count,
+                    'mean_seconds': stats['wait_total'][priority] / count,
+                    'max_seconds': stats['wait_max'][priority],
+                }
+                for priority, count in stats['wait_count'].items()
+            }
+            return {
+                'queue_depth': depth,
+                'wait_time': waits,
+                'inflight_reads': len(self._inflight),
+                'calls': stats['calls'],
+                'coalesced': stats['coalesced'],
+                'retries': stats['retries'],
+                'throttled': stats['throttled'],
+            }
+
+
+_SCHEDULER = RequestScheduler()
+
+
+def get_scheduler():
+    """Returns the process-wide request scheduler shared by every connector."""
+    return _SCHEDULER
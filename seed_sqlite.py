@@ -0,0 +1,44 @@
+"""Seeds the local SQLite backend from sheet exports, so STORAGE_BACKEND = "sqlite" has Admins and Users to log in with.
+
+Run with: python seed_sqlite.py SHEET_URL Admins admins.csv Users users.xlsx [--db pragyanai_seminar.db]
+"""
+import argparse
+
+import pandas as pd
+
+from sqlite_db import DEFAULT_DB_PATH, SQLiteConnector
+
+
+def read_export(path):
+    """Reads a .csv or .xlsx export of one tab as text cells (blank cells become "")."""
+    if path.lower().endswith(".xlsx"):
+        df = pd.read_excel(path, dtype=str, engine="openpyxl")
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    df.columns = [str(column).strip() for column in df.columns]
+    return df.fillna("")
+
+
+def seed(db_path, sheet_url, tabs):
+    """Replaces each (worksheet name, export path) tab of the spreadsheet in the local database."""
+    connector = SQLiteConnector(db_path=db_path)
+    for worksheet_name, path in tabs:
+        df = read_export(path)
+        connector.load_dataframe(sheet_url, worksheet_name, df)
+        print(f"  {worksheet_name}: {len(df)} rows from {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sheet_url", help="URL of the Google Sheet the tabs belong to (e.g. the app's SHEET_URL)")
+    parser.add_argument("tabs", nargs="+", metavar="WORKSHEET FILE", help="worksheet names, each followed by its export")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"SQLite database file (default: {DEFAULT_DB_PATH})")
+    args = parser.parse_args(argv)
+    if len(args.tabs) % 2:
+        parser.error("every worksheet name needs an export file")
+    print(f"Seeding {args.db}")
+    seed(args.db, args.sheet_url, list(zip(args.tabs[::2], args.tabs[1::2])))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from prefetch import get_prefetcher
+from tagged_cache import cache_by_sheet
 
-# --- Caching function for Seminar Data (Already existing) ---
-@st.cache_data(ttl=600)  # Cache the data for 10 minutes (600 seconds)
+# --- Seminar Data (cached by the connector until the sheet's revision changes) ---
 def get_seminar_data(_db_connector, url, name):
-    """Fetches and processes seminar data, caching the result."""
-    # Note: _db_connector is intentionally prefixed with '_' so Streamlit doesn't try to hash the object
+    """Fetches and processes seminar data."""
     seminar_sheet = _db_connector.get_worksheet(url, name)
     if seminar_sheet:
         seminars_df = _db_connector.get_dataframe(seminar_sheet)
@@ -18,11 +18,9 @@ def get_seminar_data(_db_connector, url, name):
         return upcoming_seminars_df
     return pd.DataFrame()
 
-# --- Caching function for Presenter/Enrollment Data (Already existing) ---
-@st.cache_data(ttl=600)  # Cache enrollment data for 10 minutes
+# --- Presenter/Enrollment Data (cached by the connector until the sheet's revision changes) ---
 def get_presenters_data(_db_connector, link, worksheet_name):
     """Fetches presenter data from a specific enrollment link."""
-    # Note: _db_connector is intentionally prefixed with '_'
     try:
         enrollment_ws = _db_connector.get_worksheet(link, worksheet_name)
         if enrollment_ws:
@@ -33,11 +31,12 @@ def get_presenters_data(_db_connector, link, worksheet_name):
     return pd.DataFrame()
 
 # --- MODIFIED: Caching function to fetch the Quiz Workbook and Worksheet Titles ---
-@st.cache_data(ttl=600)
+# Tagged with the quiz workbook, so only a refresh of that workbook evicts it
+@cache_by_sheet('link', ttl=600)
 def get_quiz_workbook_and_sheets(_db_connector, link):
     """Fetches the quiz workbook and returns the spreadsheet object and all worksheet titles."""
     try:
-        spreadsheet = _db_connector.client.open_by_url(link)
+        spreadsheet = _db_connector.get_spreadsheet(link)
         sheet_titles = [ws.title for ws in spreadsheet.worksheets()]
         # Return the actual spreadsheet object and the list of sheet names
         return spreadsheet, sheet_titles
@@ -75,24 +74,37 @@ def seminar_session_main(db_connector):
     """The main function for the Live Seminar Session page."""
     st.header("🎤 Go to a Live Session")
 
+    # Define constants for Google Sheets
+    SEMINAR_SHEET_URL = "https://docs.google.com/spreadsheets/d/1EeuqOzuc90owGbTZTp7XNJObYkFc9gzbG_v-Mko78mc/edit?usp=sharing"
+    SEMINAR_WORKSHEET_NAME = "Seminar_Guest_Event_List"
+
     # --- Add a refresh button ---
     if st.button("🔄 Refresh Events List"):
         # Clear session state related to the session view to reset the page
         st.session_state.pop('show_live_session', None)
-        st.session_state.pop('live_session_details', None)
+        live_session_details = st.session_state.pop('live_session_details', None) or {}
         st.session_state.pop('live_session_presenter', None)
         
-        # Invalidate the cached data to force a fresh API call
-        get_seminar_data.clear()
-        get_presenters_data.clear()
+        # Refresh only the events list (and the open session's enrollment sheet), and drop queued prefetches for the old list
+        get_prefetcher().cancel()
+        db_connector.invalidate_snapshots(SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME)
+        enrollment_link = live_session_details.get('Seminar_GuestLecture_Sheet_Link')
+        if enrollment_link and "docs.google.com/spreadsheets" in enrollment_link:
+            db_connector.invalidate_snapshots(enrollment_link, "Seminar_GuestLecture_List")
         
         st.rerun()
 
-    # Define constants for Google Sheets
-    SEMINAR_SHEET_URL = "https://docs.google.com/spreadsheets/d/1EeuqOzuc90owGbTZTp7XNJObYkFc9gzbG_v-Mko78mc/edit?usp=sharing"
-    SEMINAR_WORKSHEET_NAME = "Seminar_Guest_Event_List"
+    # --- Warm independent sheets concurrently: the seminar list and, in a live session, its enrollment sheet ---
+    warm_targets = [(SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME)]
+    live_enrollment_link = st.session_state.get('live_session_details', {}).get('Seminar_GuestLecture_Sheet_Link')
+    if st.session_state.get('show_live_session', False) and live_enrollment_link:
+        warm_targets.append((live_enrollment_link, "Seminar_GuestLecture_List"))
+    try:
+        db_connector.get_dataframes(warm_targets)
+    except Exception:
+        pass  # The individual fetches below report their own errors
 
-    # --- Fetch and Filter Seminar Data (Now uses cached function) ---
+    # --- Fetch and Filter Seminar Data (served from the shared snapshots warmed above) ---
     try:
         # Pass db_connector as the non-hashed argument
         upcoming_seminars_df = get_seminar_data(db_connector, SEMINAR_SHEET_URL, SEMINAR_WORKSHEET_NAME)
@@ -106,6 +118,10 @@ def seminar_session_main(db_connector):
             st.info("There are no current or upcoming seminar events.")
             return
 
+        # Warm the enrollment sheets of the next upcoming events in the background
+        if 'Seminar_GuestLecture_Sheet_Link' in upcoming_seminars_df.columns:
+            get_prefetcher().schedule(db_connector, upcoming_seminars_df['Seminar_GuestLecture_Sheet_Link'].astype(str).tolist())
+
         st.subheader("Step 1: Select a Seminar")
         event_options = upcoming_seminars_df['Seminar_Event_Name'].tolist()
         selected_event_name = st.selectbox("Choose an event:", options=["-- Select an Event --"] + event_options)
@@ -117,6 +133,7 @@ def seminar_session_main(db_connector):
             seminar_details = upcoming_seminars_df[upcoming_seminars_df['Seminar_Event_Name'] == selected_event_name].iloc[0]
             enrollment_sheet_link = seminar_details.get('Seminar_GuestLecture_Sheet_Link')
             if enrollment_sheet_link:
+                get_prefetcher().record_access(enrollment_sheet_link)
                 # --- Get presenter data using cached function ---
                 # Pass db_connector as the non-hashed argument
                 presenters_df = get_presenters_data(db_connector, enrollment_sheet_link, "Seminar_GuestLecture_List")
@@ -146,8 +163,10 @@ def seminar_session_main(db_connector):
         st.success(f"Now Viewing: {live_details.get('Seminar_Event_Name')} with {live_presenter}")
 
         if st.button("🔄 Refresh Session Info"):
-            # Clear data cache and rerun to get fresh info on demand
-            get_presenters_data.clear() 
+            # Clear the enrollment sheet's cached data and rerun to get fresh info on demand
+            enrollment_link = live_details.get('Seminar_GuestLecture_Sheet_Link')
+            if enrollment_link:
+                db_connector.invalidate_snapshots(enrollment_link, "Seminar_GuestLecture_List")
             st.rerun()
 
         # --- Dynamic Data Retrieval for Tabs ---
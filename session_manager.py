@@ -0,0 +1,144 @@
+import datetime
+import threading
+import time
+
+import gspread
+import requests
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """An HTTPAdapter that keeps the connection pools it creates, to report how often connections are reused.
+
+    Pools are built from subclasses registered through the pool manager's public
+    pool_classes_by_scheme; their num_connections and num_requests counters are public too.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Set before HTTPAdapter.__init__, which builds the pool manager.
+        self.connection_pools = []
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        registry = self.connection_pools
+
+        def counted(pool_class):
+            class CountedPool(pool_class):
+                def __init__(self, *pool_args, **pool_kwargs):
+                    super().__init__(*pool_args, **pool_kwargs)
+                    registry.append(self)
+            return CountedPool
+
+        # A new dict: the default one is shared by every PoolManager in the process.
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: counted(pool_class) for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+    def counts(self):
+        """Returns (connections opened, requests sent) over every pool this adapter created."""
+        pools = list(self.connection_pools)
+        return sum(pool.num_connections for pool in pools), sum(pool.num_requests for pool in pools)
+
+
+class SheetsSessionManager:
+    """Owns the service-account credentials and one pooled, keep-alive HTTP session for gspread.
+
+    Lives for the whole process, outside st.cache_resource, so clearing Streamlit's
+    caches or refreshing data never forces a re-authorization or a new TLS handshake.
+    Tokens are refreshed on a background thread refresh_margin seconds before they
+    expire, so no page request waits on the token endpoint.
+    """
+
+    def __init__(self, service_account_info, pool_size=20, refresh_margin=300):
+        self.refresh_margin = refresh_margin
+        self.credentials = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
+        self._lock = threading.Lock()
+        self.token_refreshes = 0
+        self.refresh_failures = 0
+        self.last_refresh = None
+
+        self.session = AuthorizedSession(self.credentials)
+        self._adapter = CountingHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", self._adapter)
+        self.client = gspread.Client(auth=self.credentials, session=self.session)
+        # Token requests use their own keep-alive session; the authorized one would try to authorize them.
+        self._token_request = Request(requests.Session())
+
+        try:
+            self.refresh_token()
+        except Exception:
+            # Offline at startup: the saved snapshots are still served; the refresher keeps retrying.
+            self.refresh_failures += 1
+        self._thread = threading.Thread(target=self._run, name="sheets-token-refresher", daemon=True)
+        self._thread.start()
+
+    # --- Tokens ---
+    def _seconds_left(self):
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return 0
+        # google-auth keeps expiry as a naive UTC datetime.
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (expiry - now).total_seconds()
+
+    def refresh_token(self):
+        """Fetches a new access token now."""
+        with self._lock:
+            self.credentials.refresh(self._token_request)
+            self.token_refreshes += 1
+            self.last_refresh = time.time()
+
+    def token(self):
+        """Returns a valid access token, refreshing it first if it is inside the refresh margin."""
+        with self._lock:
+            fresh = self.credentials.valid and self._seconds_left() > self.refresh_margin
+            token = self.credentials.token
+        if not fresh:
+            self.refresh_token()
+            token = self.credentials.token
+        return token
+
+    def _run(self):
+        while True:
+            time.sleep(max(self._seconds_left() - self.refresh_margin, 5))
+            if self._seconds_left() <= self.refresh_margin:
+                try:
+                    self.refresh_token()
+                except Exception:
+                    # Retried on the next wake-up; token() still refreshes on demand.
+                    self.refresh_failures += 1
+
+    # --- Metrics ---
+    def stats(self):
+        """Returns token-refresh counts and how often pooled connections were reused."""
+        connections, sent = self._adapter.counts()
+        return {
+            'token_refreshes': self.token_refreshes,
+            'refresh_failures': self.refresh_failures,
+            'token_seconds_left': round(self._seconds_left()),
+            'connections_opened': connections,
+            'requests': sent,
+            'connections_reused': max(sent - connections, 0),
+        }
+
+
+_MANAGER = None
+_MANAGER_LOCK = threading.Lock()
+
+
+def get_session_manager(service_account_info):
+    """Returns the process-wide session manager, replaced only if the service account changes."""
+    global _MANAGER
+    service_account_info = dict(service_account_info)
+    with _MANAGER_LOCK:
+        if _MANAGER is None or _MANAGER.credentials.service_account_email != service_account_info.get("client_email"):
+            _MANAGER = SheetsSessionManager(service_account_info)
+        return _MANAGER
@@ -0,0 +1,101 @@
+import pandas as pd
+
+# --- Column layouts of the worksheets the app reads and writes ---
+# The order matches the rows the pages append (signup_form, the organizer "Create New Event" form).
+
+USERS_HEADERS = [
+    'FullName', 'CollegeName', 'Branch', 'RollNO(UniversityRegNo)', 'YearofPassing_Passed',
+    'Phone(login)', 'Phone(Whatsapp)', 'Email', 'Password', 'Status', 'Role',
+    'Experience', 'Brief_Presentor', 'LinkedinProfile', 'Github_Profile', 'Area_of_Interest'
+]
+
+ADMINS_HEADERS = ['Phone(login)', 'UserName', 'Password']
+
+SEMINAR_HEADERS = [
+    'Event_Date', 'Seminar_Event_Name', 'Domain', 'BriefDescription', 'External_URL',
+    'Approved_Status', 'Status', 'WhatsappLink', 'Meet_session_Link',
+    'Seminar_GuestLecture_Sheet_Link', 'Seminar Evaluation-GoogleFormLink',
+    'Sample_Presentation_Links', 'Sample_Quizz_Links', 'Sample_Recording_Links',
+    'Organizer_Name'
+]
+
+ENROLLMENT_HEADERS = [
+    'Presentor_FullName', 'Phone(login)', 'Email', 'PresentationLink',
+    'Dict_Quizz_List', 'IsQuizz_During_Session_Available'
+]
+
+ENROLLMENTS_HEADERS = ['Phone(login)', 'FullName', 'Seminar_Event_Name', 'Enrolled_At']
+
+WORKSHEET_HEADERS = {
+    'Users': USERS_HEADERS,
+    'Admins': ADMINS_HEADERS,
+    'Seminar_Guest_Event_List': SEMINAR_HEADERS,
+    'Seminar_GuestLecture_List': ENROLLMENT_HEADERS,
+    'Enrollments': ENROLLMENTS_HEADERS,
+}
+
+# Columns that the pages look records up by; local backends index them.
+WORKSHEET_INDEXES = {
+    'Users': ['Phone(login)', 'Status'],
+    'Admins': ['Phone(login)'],
+    'Seminar_Guest_Event_List': ['Seminar_Event_Name', 'Approved_Status', 'Organizer_Name'],
+    'Seminar_GuestLecture_List': ['Presentor_FullName', 'Phone(login)'],
+    'Enrollments': ['Phone(login)', 'Seminar_Event_Name'],
+}
+
+# Columns that must never be written to local caches on disk. The one exception is the
+# write-behind outbox, which holds a signup's row only until it is written (see write_queue).
+SECRET_COLUMNS = {'Password'}
+
+# Sheets that only grow at the bottom; they are synced incrementally instead of re-downloaded.
+APPEND_MOSTLY_WORKSHEETS = {'Users', 'Seminar_GuestLecture_List', 'Enrollments'}
+
+# --- Declared column types, applied in one vectorized pass when a sheet is loaded ---
+# 'date': parsed with pd.to_datetime (invalid values become NaT)
+# 'category': low-cardinality labels compared with == / isin
+# 'string': kept as text with surrounding whitespace removed (phone numbers must not become ints)
+# Columns that are not declared stay as the raw cell text.
+WORKSHEET_DTYPES = {
+    'Users': {
+        'Phone(login)': 'string', 'Phone(Whatsapp)': 'string',
+        'Status': 'category', 'Role': 'category',
+    },
+    'Admins': {
+        'Phone(login)': 'string',
+    },
+    'Seminar_Guest_Event_List': {
+        'Event_Date': 'date', 'Domain': 'category', 'Approved_Status': 'category', 'Status': 'category',
+    },
+    'Seminar_GuestLecture_List': {
+        'Phone(login)': 'string', 'IsQuizz_During_Session_Available': 'category',
+    },
+    'Enrollments': {
+        'Phone(login)': 'string', 'Seminar_Event_Name': 'string',
+    },
+}
+
+
+def apply_schema(df, worksheet_name):
+    """Converts the declared columns of a worksheet's frame to their types, in place."""
+    for column, kind in WORKSHEET_DTYPES.get(worksheet_name, {}).items():
+        if column not in df.columns:
+            continue
+        if kind == 'date':
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+        elif kind == 'category':
+            df[column] = df[column].astype(str).str.strip().astype('category')
+        elif kind == 'string':
+            df[column] = df[column].astype(str).str.strip()
+    return df
+
+
+def frame_from_values(values, worksheet_name):
+    """Builds a typed DataFrame from a get_all_values() grid whose first row holds the headers."""
+    if not values:
+        return pd.DataFrame()
+    headers, rows = values[0], values[1:]
+    width = len(headers)
+    # gspread pads the grid, but rows appended by other writers may still be ragged.
+    if any(len(row) != width for row in rows):
+        rows = [(list(row) + [""] * width)[:width] for row in rows]
+    return apply_schema(pd.DataFrame(rows, columns=headers, dtype=object), worksheet_name)
@@ -0,0 +1,454 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+
+from request_scheduler import PRIORITY_BACKGROUND, get_scheduler, is_outage
+
+# Snapshots are shared by every session as shallow copies, so a page that modifies its
+# frame must never write through to the snapshot. pandas 3 always copies on write.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files/{}"
+
+
+class DriveRevisionSource:
+    """Reads a spreadsheet's Drive version with one small metadata request."""
+
+    def __init__(self, client, scheduler=None):
+        self.client = client
+        self.scheduler = scheduler
+
+    def get_revision(self, spreadsheet_key):
+        request = lambda: self.client.http_client.request(
+            "get",
+            DRIVE_FILES_URL.format(spreadsheet_key),
+            params={"fields": "version,modifiedTime", "supportsAllDrives": True},
+        )
+        if self.scheduler is None:
+            response = request()
+        else:
+            response = self.scheduler.call('drive', request, coalesce_key=('revision', spreadsheet_key))
+        metadata = response.json()
+        return metadata.get("version") or metadata.get("modifiedTime")
+
+
+class StaticRevisionSource:
+    """A stand-in metadata source for tests and offline runs; call bump() to simulate an edit."""
+
+    def __init__(self, revisions=None):
+        self.revisions = dict(revisions or {})
+        self.probes = 0
+
+    def get_revision(self, spreadsheet_key):
+        self.probes += 1
+        return self.revisions.get(spreadsheet_key, 0)
+
+    def bump(self, spreadsheet_key):
+        self.revisions[spreadsheet_key] = self.revisions.get(spreadsheet_key, 0) + 1
+
+
+class Snapshot:
+    """An immutable, versioned copy of one worksheet's records."""
+
+    def __init__(self, spreadsheet_key, worksheet_name, version, revision, df, fetched_at=None, source='network'):
+        self.spreadsheet_key = spreadsheet_key
+        self.worksheet_name = worksheet_name
+        self.version = version
+        self.revision = revision
+        self.fetched_at = fetched_at or time.time()
+        # 'network' for a fetched snapshot, 'disk' for one restored from the on-disk cache.
+        self.source = source
+        # Travel with every frame() copy, so derived indexes can be keyed on the worksheet and its version.
+        df.attrs['snapshot_key'] = (spreadsheet_key, worksheet_name)
+        df.attrs['snapshot_version'] = version
+        self._df = df
+        self.nbytes = int(df.memory_usage(deep=True).sum()) if not df.empty else 0
+
+    def frame(self):
+        """Returns a shallow, copy-on-write view that callers may modify freely."""
+        return self._df.copy(deep=False)
+
+    def __len__(self):
+        return len(self._df)
+
+
+def index_version(df):
+    """Returns the (snapshot version, row count) a frame was built from, or None if it is not a snapshot."""
+    if df is None:
+        return None
+    version = df.attrs.get('snapshot_version')
+    return (version, len(df)) if version is not None else None
+
+
+# --- Objects derived from snapshots (indexes, roll-ups), one slot per name and worksheet(s) ---
+_DERIVED = {}
+_DERIVED_LOCK = threading.Lock()
+
+
+def cached_by_snapshot(name, frames, factory):
+    """Returns factory(frames), reusing the object built from the same snapshots of the same worksheets.
+
+    frames is a DataFrame or a {label: DataFrame} dict. The slot is keyed by name and the
+    (spreadsheet key, worksheet) of every frame, and rebuilt when a snapshot version or row
+    count changes. Frames that are not snapshots (local backends, dummy data) are never cached.
+    """
+    items = frames.items() if isinstance(frames, dict) else [(None, frames)]
+    sheets, versions = [], []
+    for label, df in items:
+        version = index_version(df)
+        if version is None:
+            return factory(frames)
+        sheets.append((label, df.attrs.get('snapshot_key')))
+        versions.append(version)
+    slot, versions = (name, tuple(sheets)), tuple(versions)
+    with _DERIVED_LOCK:
+        entry = _DERIVED.get(slot)
+    if entry is not None and entry[0] == versions:
+        return entry[1]
+    built = factory(frames)
+    with _DERIVED_LOCK:
+        _DERIVED[slot] = (versions, built)
+    return built
+
+
+class DiskSnapshotCache:
+    """Persists snapshots as Arrow IPC files, one per worksheet, with the revision in the schema metadata.
+
+    Files are read back memory-mapped, so a restarted process has its data without
+    calling the API. Writes go to a temporary file first and are swapped in
+    atomically; they run on one background thread, off the page's critical path.
+    """
+
+    def __init__(self, directory, secret_columns=()):
+        self.directory = directory
+        # Worksheets with any of these columns (e.g. passwords) are never written to disk.
+        self.secret_columns = set(secret_columns)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-persist")
+        self.saved = 0
+        self.failures = 0
+
+    def _path(self, spreadsheet_key, worksheet_name):
+        digest = hashlib.sha1(worksheet_name.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.directory, f"{spreadsheet_key}__{digest}.arrow")
+
+    def _persistable(self, columns):
+        return not self.secret_columns.intersection(columns)
+
+    def _write(self, snapshot):
+        if not self._persistable(snapshot._df.columns):
+            return
+        try:
+            table = pa.Table.from_pandas(snapshot._df, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[b"snapshot"] = json.dumps({
+                'spreadsheet_key': snapshot.spreadsheet_key,
+                'worksheet_name': snapshot.worksheet_name,
+                'revision': snapshot.revision,
+                'fetched_at': snapshot.fetched_at,
+            }).encode("utf-8")
+            table = table.replace_schema_metadata(metadata)
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(snapshot.spreadsheet_key, snapshot.worksheet_name)
+            with pa.OSFile(path + ".tmp", "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(path + ".tmp", path)
+            self.saved += 1
+        except Exception:
+            # The disk copy is only a warm-start and outage fallback; the in-memory snapshot is unaffected.
+            self.failures += 1
+
+    def save(self, snapshot):
+        """Writes a snapshot to disk in the background."""
+        self._executor.submit(self._write, snapshot)
+
+    def load_all(self):
+        """Yields (metadata, frame) for every readable snapshot file in the directory."""
+        if not os.path.isdir(self.directory):
+            return
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".arrow"):
+                continue
+            try:
+                path = os.path.join(self.directory, filename)
+                with pa.memory_map(path, "r") as source:
+                    table = pa.ipc.open_file(source).read_all()
+                    metadata = json.loads(table.schema.metadata[b"snapshot"])
+                    df = table.to_pandas()
+            except Exception:
+                self.failures += 1
+                continue
+            if not self._persistable(df.columns):
+                # Written before secret columns were kept off disk; do not keep it around.
+                os.remove(path)
+                continue
+            yield metadata, df
+
+
+class SnapshotStore:
+    """A process-wide store of worksheet snapshots shared by every Streamlit session.
+
+    Snapshots are validated against each spreadsheet's revision: a probe is a single
+    metadata request, shared by every worksheet of a spreadsheet for probe_interval
+    seconds, and the full values fetch only runs when the revision changed. Refreshes
+    are single-flight, so one fetch serves every session waiting on the same worksheet.
+
+    With a disk cache, snapshots saved by a previous process are served at once on
+    startup while they are revalidated in the background, and the last snapshot of a
+    worksheet keeps being served (read-only) while the API cannot be reached.
+    """
+
+    def __init__(self, probe_interval=2.0, disk=None, offline_retry_interval=30.0):
+        self.probe_interval = probe_interval
+        self.disk = disk
+        self.offline_retry_interval = offline_retry_interval
+        self._snapshots = {}
+        self._stale = set()
+        self._unverified = set()
+        self._probes = {}
+        self._inflight = {}
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self._offline_until = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared_waits = 0
+        self.probe_count = 0
+        self.disk_loads = 0
+        self.offline_serves = 0
+        if disk is not None:
+            self._load_from_disk()
+
+    # --- Disk cache and outage fallback ---
+    def _load_from_disk(self):
+        for metadata, df in self.disk.load_all():
+            key = (metadata['spreadsheet_key'], metadata['worksheet_name'])
+            self._snapshots[key] = Snapshot(
+                key[0], key[1], next(self._versions), metadata['revision'], df,
+                fetched_at=metadata['fetched_at'], source='disk',
+            )
+            self._unverified.add(key)
+            self.disk_loads += 1
+
+    def _publish(self, snapshot):
+        key = (snapshot.spreadsheet_key, snapshot.worksheet_name)
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._stale.discard(key)
+            self._unverified.discard(key)
+        if self.disk is not None:
+            self.disk.save(snapshot)
+
+    def offline(self, spreadsheet_key=None):
+        """True while the API recently failed for the spreadsheet (or for any, without a key) and its last snapshots are served."""
+        now = time.monotonic()
+        with self._lock:
+            if spreadsheet_key is None:
+                return any(now < until for until in self._offline_until.values())
+            return now < self._offline_until.get(spreadsheet_key, 0.0)
+
+    def go_offline(self, spreadsheet_key):
+        """Serves the spreadsheet's last snapshots without probing it for offline_retry_interval seconds."""
+        with self._lock:
+            self._offline_until[spreadsheet_key] = time.monotonic() + self.offline_retry_interval
+
+    def serve_offline(self, spreadsheet_key, worksheet_name):
+        """Returns the last snapshot of a worksheet, however old, or None if there is none."""
+        with self._lock:
+            snapshot = self._snapshots.get((spreadsheet_key, worksheet_name))
+            if snapshot is not None:
+                self.offline_serves += 1
+        return snapshot
+
+    def _revalidate(self, spreadsheet_key, worksheet_name, fetch, revision_source):
+        with get_scheduler().lane(PRIORITY_BACKGROUND):
+            try:
+                self.get_snapshot(spreadsheet_key, worksheet_name, fetch, revision_source)
+            except Exception:
+                pass
+
+    def cached_revision(self, spreadsheet_key):
+        """Returns the spreadsheet's last probed revision if it is recent enough to trust, else None."""
+        with self._lock:
+            probe = self._probes.get(spreadsheet_key)
+            if probe and time.monotonic() - probe[1] < self.probe_interval:
+                return probe[0]
+        return None
+
+    def record_revision(self, spreadsheet_key, revision):
+        """Records a revision probed elsewhere (e.g. by the async connector)."""
+        with self._lock:
+            self._probes[spreadsheet_key] = (revision, time.monotonic())
+            self.probe_count += 1
+
+    def _current_revision(self, spreadsheet_key, revision_source):
+        now = time.monotonic()
+        with self._lock:
+            probe = self._probes.get(spreadsheet_key)
+            if probe and now - probe[1] < self.probe_interval:
+                return probe[0]
+        revision = revision_source.get_revision(spreadsheet_key)
+        with self._lock:
+            self._probes[spreadsheet_key] = (revision, now)
+            self.probe_count += 1
+        return revision
+
+    def _valid(self, key, revision):
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and key not in self._stale and snapshot.revision == revision:
+            return snapshot
+        return None
+
+    def lookup(self, spreadsheet_key, worksheet_name, revision_source):
+        """Returns (the current snapshot's frame or None if stale, current revision).
+
+        Only hits are counted; a miss is counted by the get_snapshot() call that refreshes it.
+        """
+        # Probe before any fetch, so an edit made during the fetch is caught by the next probe.
+        revision = self._current_revision(spreadsheet_key, revision_source)
+        with self._lock:
+            snapshot = self._valid((spreadsheet_key, worksheet_name), revision)
+            if snapshot is not None:
+                self._unverified.discard((spreadsheet_key, worksheet_name))
+                self.hits += 1
+                return snapshot.frame(), revision
+        return None, revision
+
+    def get_snapshot(self, spreadsheet_key, worksheet_name, fetch, revision_source):
+        """Returns the current snapshot, refreshing it with fetch() (once, for all waiters) if stale."""
+        key = (spreadsheet_key, worksheet_name)
+        with self._lock:
+            restored = self._snapshots.get(key) if key in self._unverified else None
+            self._unverified.discard(key)
+        if restored is not None:
+            # Serve the copy restored from disk now and check it against the sheet in the background.
+            threading.Thread(
+                target=self._revalidate, args=(spreadsheet_key, worksheet_name, fetch, revision_source),
+                name="snapshot-revalidate", daemon=True,
+            ).start()
+            with self._lock:
+                self.hits += 1
+            return restored
+        if self.offline(spreadsheet_key):
+            snapshot = self.serve_offline(spreadsheet_key, worksheet_name)
+            if snapshot is not None:
+                return snapshot
+        try:
+            revision = self._current_revision(spreadsheet_key, revision_source)
+        except Exception as e:
+            snapshot = self.serve_offline(spreadsheet_key, worksheet_name) if is_outage(e) else None
+            if snapshot is None:
+                raise
+            self.go_offline(spreadsheet_key)
+            return snapshot
+        with self._lock:
+            snapshot = self._valid(key, revision)
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            future = self._inflight.get(key)
+            if future is None:
+                self.misses += 1
+                self._inflight[key] = owner = Future()
+            else:
+                self.shared_waits += 1
+        if future is not None:
+            return future.result()
+        try:
+            snapshot = Snapshot(spreadsheet_key, worksheet_name, next(self._versions), revision, fetch())
+            self._publish(snapshot)
+            owner.set_result(snapshot)
+            return snapshot
+        except Exception as e:
+            # Only an outage falls back to the last snapshot; a 403, a 404 or a renamed tab is the caller's error.
+            snapshot = self.serve_offline(spreadsheet_key, worksheet_name) if is_outage(e) else None
+            if snapshot is None:
+                owner.set_exception(e)
+                raise
+            self.go_offline(spreadsheet_key)
+            owner.set_result(snapshot)
+            return snapshot
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get(self, spreadsheet_key, worksheet_name, fetch, revision_source):
+        """Returns a frame of the current snapshot, calling fetch() only when the sheet changed."""
+        return self.get_snapshot(spreadsheet_key, worksheet_name, fetch, revision_source).frame()
+
+    def peek(self, spreadsheet_key, worksheet_name):
+        """Returns the last snapshot's frame without validating it, or None."""
+        snapshot = self.peek_snapshot(spreadsheet_key, worksheet_name)
+        return snapshot.frame() if snapshot is not None else None
+
+    def peek_snapshot(self, spreadsheet_key, worksheet_name):
+        """Returns the last Snapshot itself (with its version and revision) without validating it, or None."""
+        with self._lock:
+            return self._snapshots.get((spreadsheet_key, worksheet_name))
+
+    def current_revision(self, spreadsheet_key, revision_source):
+        """Returns the spreadsheet's revision, probing it unless a recent probe can be reused."""
+        return self._current_revision(spreadsheet_key, revision_source)
+
+    def mark_stale(self, spreadsheet_key, worksheet_name):
+        """Forces a refresh on the next read while keeping the snapshot available to peek(); returns 1 if there was one."""
+        with self._lock:
+            self._probes.pop(spreadsheet_key, None)
+            if (spreadsheet_key, worksheet_name) in self._snapshots:
+                self._stale.add((spreadsheet_key, worksheet_name))
+                return 1
+        return 0
+
+    def invalidate(self, spreadsheet_key=None, worksheet_name=None):
+        """Drops matching snapshots (and their spreadsheet's probe), e.g. after a write; returns how many."""
+        dropped = 0
+        with self._lock:
+            for key in list(self._snapshots):
+                if spreadsheet_key is not None and key[0] != spreadsheet_key:
+                    continue
+                if worksheet_name is not None and key[1] != worksheet_name:
+                    continue
+                del self._snapshots[key]
+                self._stale.discard(key)
+                self._unverified.discard(key)
+                dropped += 1
+            if spreadsheet_key is None:
+                self._probes.clear()
+            else:
+                self._probes.pop(spreadsheet_key, None)
+        return dropped
+
+    def report(self):
+        """Returns one row per snapshot (version, revision, rows, memory) plus store counters."""
+        now = time.time()
+        offline = self.offline()
+        with self._lock:
+            rows = [
+                {
+                    'spreadsheet': snapshot.spreadsheet_key,
+                    'worksheet': snapshot.worksheet_name,
+                    'version': snapshot.version,
+                    'revision': snapshot.revision,
+                    'rows': len(snapshot),
+                    'bytes': snapshot.nbytes,
+                    'age_seconds': round(now - snapshot.fetched_at, 1),
+                    'stale': key in self._stale,
+                    'source': snapshot.source,
+                }
+                for key, snapshot in self._snapshots.items()
+            ]
+            counters = {
+                'hits': self.hits, 'misses': self.misses, 'shared_waits': self.shared_waits,
+                'probes': self.probe_count, 'total_bytes': sum(row['bytes'] for row in rows),
+                'disk_loads': self.disk_loads, 'offline_serves': self.offline_serves,
+                'offline': offline,
+            }
+        return rows, counters
@@ -0,0 +1,288 @@
+import json
+import sqlite3
+import threading
+
+import streamlit as st
+import pandas as pd
+from gspread.utils import extract_id_from_url, rowcol_to_a1
+
+from login_index import LOGIN_COLUMN, normalize_phone
+from sheet_schema import WORKSHEET_HEADERS, WORKSHEET_INDEXES, apply_schema
+from storage_backend import StorageBackend
+
+DEFAULT_DB_PATH = "pragyanai_seminar.db"
+
+# --- One shared connection per database file; Streamlit runs each session in its own thread ---
+_CONNECTIONS = {}
+_CONNECTIONS_LOCK = threading.Lock()
+
+
+def _quote(identifier):
+    """Quotes a sheet header or tab title for use as an SQLite identifier."""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def _lookup_key(column, value):
+    """The stored form of an indexed value: login phones normalized, anything else stripped."""
+    return normalize_phone(value) if column == LOGIN_COLUMN else str(value).strip()
+
+
+class SQLiteSpreadsheet:
+    """A spreadsheet handle backed by rows in the local SQLite database."""
+
+    def __init__(self, connector, spreadsheet_key):
+        self.connector = connector
+        self.id = spreadsheet_key
+
+    def worksheet(self, worksheet_name):
+        worksheet = self.connector._open_worksheet(self.id, worksheet_name)
+        if worksheet is None:
+            raise LookupError(f"Worksheet '{worksheet_name}' not found.")
+        return worksheet
+
+    def worksheets(self):
+        rows = self.connector._query(
+            "SELECT title FROM _worksheets WHERE spreadsheet = ? ORDER BY position",
+            (self.id,)
+        )
+        return [self.worksheet(title) for (title,) in rows]
+
+
+class SQLiteWorksheet:
+    """A worksheet handle: one SQLite table per tab title, partitioned by spreadsheet key."""
+
+    def __init__(self, spreadsheet_id, title, headers):
+        self.spreadsheet_id = spreadsheet_id
+        self.title = title
+        self.headers = list(headers)
+
+
+class SQLiteConnector(StorageBackend):
+    """A local SQLite (WAL mode) engine with the same interface as GoogleSheetsConnector."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        super().__init__()
+        self.db_path = db_path
+        self.conn, self.lock = self._get_connection(db_path)
+
+    @staticmethod
+    def _get_connection(db_path):
+        with _CONNECTIONS_LOCK:
+            if db_path not in _CONNECTIONS:
+                conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS _worksheets ("
+                    "spreadsheet TEXT NOT NULL, title TEXT NOT NULL, headers TEXT NOT NULL, "
+                    "position INTEGER NOT NULL, PRIMARY KEY (spreadsheet, title))"
+                )
+                _CONNECTIONS[db_path] = (conn, threading.RLock())
+            return _CONNECTIONS[db_path]
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            self.conn.execute(sql, params)
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # --- Schema management ---
+    def _ensure_table(self, title, headers):
+        """Creates the table for a tab title, adding any header columns it does not have yet."""
+        table = _quote(title)
+        with self.lock:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "_spreadsheet TEXT NOT NULL, _row INTEGER NOT NULL, PRIMARY KEY (_spreadsheet, _row))"
+            )
+            existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for header in headers:
+                if header not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {_quote(header)} TEXT")
+            for column in WORKSHEET_INDEXES.get(title, []):
+                if column in headers:
+                    index_name = _quote(f"idx_{title}_{column}")
+                    self.conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} (_spreadsheet, {_quote(column)})"
+                    )
+
+    def create_worksheet(self, sheet_url, worksheet_name, headers=None):
+        """Creates a tab in the local database, using the declared layout when none is given."""
+        spreadsheet_key = extract_id_from_url(sheet_url)
+        headers = list(headers or WORKSHEET_HEADERS.get(worksheet_name, []))
+        if not headers:
+            raise ValueError(f"No headers declared for worksheet '{worksheet_name}'.")
+        self._ensure_table(worksheet_name, headers)
+        with self.lock:
+            position = self.conn.execute(
+                "SELECT COUNT(*) FROM _worksheets WHERE spreadsheet = ?", (spreadsheet_key,)
+            ).fetchone()[0]
+            self.conn.execute(
+                "INSERT OR REPLACE INTO _worksheets (spreadsheet, title, headers, position) VALUES (?, ?, ?, ?)",
+                (spreadsheet_key, worksheet_name, json.dumps(headers), position)
+            )
+        return SQLiteWorksheet(spreadsheet_key, worksheet_name, headers)
+
+    def _open_worksheet(self, spreadsheet_key, worksheet_name):
+        rows = self._query(
+            "SELECT headers FROM _worksheets WHERE spreadsheet = ? AND title = ?",
+            (spreadsheet_key, worksheet_name)
+        )
+        if not rows:
+            return None
+        return SQLiteWorksheet(spreadsheet_key, worksheet_name, json.loads(rows[0][0]))
+
+    # --- StorageBackend interface ---
+    def get_spreadsheet(self, sheet_url):
+        """Gets a local spreadsheet handle by its Google Sheets URL."""
+        return SQLiteSpreadsheet(self, extract_id_from_url(sheet_url))
+
+    def get_worksheet(self, sheet_url, worksheet_name):
+        """Gets a worksheet, creating the known tabs (Users, Admins, ...) on first use."""
+        try:
+            spreadsheet_key = extract_id_from_url(sheet_url)
+            worksheet = self._open_worksheet(spreadsheet_key, worksheet_name)
+            if worksheet is None and worksheet_name in WORKSHEET_HEADERS:
+                worksheet = self.create_worksheet(sheet_url, worksheet_name)
+            if worksheet is None:
+                st.error(f"Worksheet '{worksheet_name}' not found in the local database.")
+            return worksheet
+        except Exception as e:
+            st.error(f"An error occurred while accessing the local database: {e}")
+        return None
+
+    def open_worksheet(self, sheet_url, worksheet_name):
+        """Opens an existing local worksheet without calling st.*; None if it has not been created."""
+        return self._open_worksheet(extract_id_from_url(sheet_url), worksheet_name)
+
+    def get_dataframe(self, worksheet):
+        """Reads every record of a worksheet, in sheet row order."""
+        if not worksheet:
+            return pd.DataFrame()
+        self.trace(worksheet.title, 'read')
+        columns = ", ".join(_quote(h) for h in worksheet.headers)
+        rows = self._query(
+            f"SELECT {columns} FROM {_quote(worksheet.title)} WHERE _spreadsheet = ? ORDER BY _row",
+            (worksheet.spreadsheet_id,)
+        )
+        return apply_schema(pd.DataFrame(rows, columns=worksheet.headers).fillna(""), worksheet.title)
+
+    def find_records(self, worksheet, lookup_col, lookup_val):
+        """Looks records up with an indexed query instead of reading the whole table (login and signup checks)."""
+        if not worksheet or lookup_col not in worksheet.headers:
+            return pd.DataFrame()
+        self.trace(worksheet.title, 'read')
+        columns = ", ".join(_quote(h) for h in worksheet.headers)
+        rows = self._query(
+            f"SELECT {columns} FROM {_quote(worksheet.title)} "
+            f"WHERE _spreadsheet = ? AND {_quote(lookup_col)} = ? ORDER BY _row",
+            (worksheet.spreadsheet_id, _lookup_key(lookup_col, lookup_val))
+        )
+        return apply_schema(pd.DataFrame(rows, columns=worksheet.headers).fillna(""), worksheet.title)
+
+    def _normalize_row(self, worksheet, row_data):
+        indexed = set(WORKSHEET_INDEXES.get(worksheet.title, []))
+        values = list(row_data)[:len(worksheet.headers)]
+        values += [""] * (len(worksheet.headers) - len(values))
+        return [
+            _lookup_key(header, value) if header in indexed else str(value)
+            for header, value in zip(worksheet.headers, values)
+        ]
+
+    def add_records(self, worksheet, rows):
+        """Appends several rows in one transaction."""
+        self.trace(worksheet.title, 'append')
+        columns = ", ".join(["_spreadsheet", "_row"] + [_quote(h) for h in worksheet.headers])
+        placeholders = ", ".join(["?"] * (len(worksheet.headers) + 2))
+        table = _quote(worksheet.title)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Row 1 of a sheet holds the headers, so data rows start at 2.
+                next_row = self.conn.execute(
+                    f"SELECT COALESCE(MAX(_row), 1) + 1 FROM {table} WHERE _spreadsheet = ?",
+                    (worksheet.spreadsheet_id,)
+                ).fetchone()[0]
+                self.conn.executemany(
+                    f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                    [
+                        [worksheet.spreadsheet_id, next_row + offset] + self._normalize_row(worksheet, row)
+                        for offset, row in enumerate(rows)
+                    ]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def add_record(self, worksheet, row_data):
+        """Appends a new row of data to the worksheet."""
+        try:
+            self.add_records(worksheet, [row_data])
+            return True
+        except Exception as e:
+            st.error(f"Failed to add record: {e}")
+            return False
+
+    def batch_update_record(self, worksheet, lookup_col, lookup_val, update_data):
+        """Updates one record in a single statement and returns per-cell results."""
+        try:
+            self.trace(worksheet.title, 'update')
+            if lookup_col not in worksheet.headers:
+                st.error(f"Column '{lookup_col}' was not found in the sheet headers.")
+                return None
+            table = _quote(worksheet.title)
+            rows = self._query(
+                f"SELECT _row FROM {table} WHERE _spreadsheet = ? AND {_quote(lookup_col)} = ? "
+                "ORDER BY _row LIMIT 1",
+                (worksheet.spreadsheet_id, _lookup_key(lookup_col, lookup_val))
+            )
+            if not rows:
+                st.error(f"Could not find record where {lookup_col} is {lookup_val}.")
+                return None
+
+            row_number = rows[0][0]
+            results, assignments, params = [], [], []
+            for col_name, new_val in update_data.items():
+                result = {'column': col_name, 'cell': None, 'value': new_val, 'updated': False}
+                results.append(result)
+                if col_name not in worksheet.headers:
+                    result['error'] = "Unknown column"
+                    continue
+                result['cell'] = rowcol_to_a1(row_number, worksheet.headers.index(col_name) + 1)
+                assignments.append(f"{_quote(col_name)} = ?")
+                params.append(str(new_val))
+            if assignments:
+                self._execute(
+                    f"UPDATE {table} SET {', '.join(assignments)} WHERE _spreadsheet = ? AND _row = ?",
+                    params + [worksheet.spreadsheet_id, row_number]
+                )
+                for result in results:
+                    result['updated'] = result['cell'] is not None
+            return results
+        except Exception as e:
+            st.error(f"Failed to update record: {e}")
+        return None
+
+    def update_record(self, worksheet, lookup_col, lookup_val, update_data):
+        """Updates a specific record in the worksheet."""
+        results = self.batch_update_record(worksheet, lookup_col, lookup_val, update_data)
+        if results is None:
+            return False
+        failed = [r['column'] for r in results if not r['updated']]
+        if failed:
+            st.error(f"Some fields were not updated: {', '.join(failed)}.")
+            return False
+        return True
+
+    # --- Seeding, e.g. from a Google Sheets export or generated load-test data ---
+    def load_dataframe(self, sheet_url, worksheet_name, df):
+        """Replaces a local worksheet with the contents of a DataFrame."""
+        worksheet = self.create_worksheet(sheet_url, worksheet_name, headers=list(df.columns))
+        self._execute(
+            f"DELETE FROM {_quote(worksheet_name)} WHERE _spreadsheet = ?", (worksheet.spreadsheet_id,)
+        )
+        self.add_records(worksheet, df.astype(str).values.tolist())
+        return worksheet
@@ -0,0 +1,140 @@
+from gspread.utils import extract_id_from_url
+
+from login_index import LOGIN_COLUMN, get_login_index
+from tagged_cache import get_tagged_cache
+
+
+class StorageBackend:
+    """The storage interface every page talks to; Google Sheets and SQLite implement it."""
+
+    def __init__(self):
+        # The app creates one connector per rerun, so this is the current rerun's trace.
+        self.trace_page = None
+        self.access_trace = []
+
+    def trace(self, worksheet_name, operation):
+        """Records that the current page read or wrote a worksheet during this rerun."""
+        self.access_trace.append({'page': self.trace_page, 'worksheet': worksheet_name, 'operation': operation})
+
+    def get_spreadsheet(self, sheet_url):
+        """Gets a spreadsheet (workbook) handle."""
+        raise NotImplementedError
+
+    def get_worksheet(self, sheet_url, worksheet_name):
+        """Gets a specific worksheet (tab) handle, or None if it is not available."""
+        raise NotImplementedError
+
+    def open_worksheet(self, sheet_url, worksheet_name):
+        """Opens a worksheet without reporting anything on the page, for background threads.
+
+        Returns None if the tab does not exist; other errors are raised to the caller.
+        """
+        raise NotImplementedError
+
+    def get_or_create_worksheet(self, sheet_url, worksheet_name):
+        """Gets a worksheet, adding it with its declared headers if it does not exist yet.
+
+        Backends that create the known tabs on first use just return get_worksheet().
+        """
+        return self.get_worksheet(sheet_url, worksheet_name)
+
+    def get_dataframe(self, worksheet):
+        """Returns the worksheet records as a pandas DataFrame."""
+        raise NotImplementedError
+
+    def get_dataframes(self, targets):
+        """Loads several (sheet_url, worksheet_name[, a1_range]) targets into {target: DataFrame}.
+
+        Backends without a batched read load each whole worksheet in turn.
+        """
+        frames = {}
+        for target in targets:
+            frames[target] = self.get_dataframe(self.get_worksheet(target[0], target[1]))
+        return frames
+
+    def add_record(self, worksheet, row_data):
+        """Appends a new row of data to the worksheet."""
+        raise NotImplementedError
+
+    def add_records(self, worksheet, rows):
+        """Appends several rows at once; raises if they could not be written.
+
+        Backends without a batched append add each row in turn.
+        """
+        for row_data in rows:
+            if not self.add_record(worksheet, row_data):
+                raise RuntimeError(f"Failed to append a row to '{worksheet.title}'.")
+
+    def append_record(self, worksheet, row_data):
+        """Appends a new row of data to the worksheet. Alias for add_record."""
+        return self.add_record(worksheet, row_data)
+
+    def enqueue_record(self, worksheet, row_data):
+        """Appends a row without waiting on the network. Local backends just write it."""
+        return self.add_record(worksheet, row_data)
+
+    def update_record(self, worksheet, lookup_col, lookup_val, update_data):
+        """Updates the first record whose lookup column equals lookup_val."""
+        raise NotImplementedError
+
+    def update_records(self, worksheet, lookup_col, updates):
+        """Applies {lookup value: {column: value}} updates and returns {lookup value: updated}.
+
+        Backends without batched writes update each record in turn.
+        """
+        return {
+            lookup_val: self.update_record(worksheet, lookup_col, lookup_val, update_data)
+            for lookup_val, update_data in updates.items()
+        }
+
+    def find_records(self, worksheet, lookup_col, lookup_val):
+        """Returns the records whose lookup column equals lookup_val (whitespace-insensitive).
+
+        Login phones are compared normalized and answered by the frame's shared login index,
+        which is only rebuilt when the worksheet's snapshot changes.
+        """
+        df = self.get_dataframe(worksheet)
+        if df.empty or lookup_col not in df.columns:
+            return df.iloc[0:0]
+        if lookup_col == LOGIN_COLUMN:
+            return get_login_index(df).records(lookup_val)
+        return df[df[lookup_col].astype(str).str.strip() == str(lookup_val).strip()]
+
+    def invalidate_worksheet(self, sheet_url=None, worksheet_name=None):
+        """Forgets any cached handles. Backends without handle caches do nothing."""
+
+    def snapshot_report(self):
+        """Returns (per-snapshot rows, counters) for backends that keep shared snapshots."""
+        return [], {}
+
+    def invalidate_snapshots(self, sheet_url=None, worksheet_name=None):
+        """Forgets what the pages cached from the matching worksheets; backends reading live data keep nothing else."""
+        spreadsheet_key = extract_id_from_url(sheet_url) if sheet_url else None
+        get_tagged_cache().invalidate(spreadsheet_key, worksheet_name, reason="refresh")
+
+    def invalidation_report(self):
+        """Returns (recent invalidations with what each one evicted, tagged cache counters)."""
+        return get_tagged_cache().stats()
+
+    def outbox_report(self):
+        """Returns (dead-lettered rows, outbox counters) for backends with a write-behind queue."""
+        return [], {}
+
+    def session_metrics(self):
+        """Returns credential and connection-pool counters for backends that talk to a remote service."""
+        return {}
+
+    def is_offline(self):
+        """True while the backend serves saved data read-only because its service is unreachable."""
+        return False
+
+
+def get_backend(name="sheets", **options):
+    """Creates the storage backend selected by name ('sheets' or 'sqlite')."""
+    if name == "sheets":
+        from google_sheets_db import GoogleSheetsConnector
+        return GoogleSheetsConnector()
+    if name == "sqlite":
+        from sqlite_db import SQLiteConnector
+        return SQLiteConnector(**options)
+    raise ValueError(f"Unknown storage backend: {name}")
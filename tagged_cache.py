@@ -0,0 +1,111 @@
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+
+from gspread.utils import extract_id_from_url
+
+
+class TaggedCache:
+    """A process-wide memo whose entries are tagged by the sheets they were computed from.
+
+    A tag is (spreadsheet_key, worksheet_name); a worksheet_name of None means the entry
+    depends on the whole spreadsheet (e.g. its list of tabs). Invalidating a worksheet
+    evicts only the entries tagged with it or with its whole spreadsheet, instead of
+    clearing every cached function for every user.
+    """
+
+    def __init__(self, log_size=50):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.log = deque(maxlen=log_size)
+
+    @staticmethod
+    def _matches(tag, spreadsheet_key, worksheet_name):
+        if spreadsheet_key is not None and tag[0] != spreadsheet_key:
+            return False
+        return worksheet_name is None or tag[1] is None or tag[1] == worksheet_name
+
+    def get_or_compute(self, key, tags, compute, ttl=None):
+        """Returns the cached value for key, computing and tagging it on a miss or after ttl seconds."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry['expires'] is None or now < entry['expires']):
+                self.hits += 1
+                return entry['value']
+            if entry is not None:
+                self.expired += 1
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = {
+                'value': value, 'tags': frozenset(tags), 'expires': now + ttl if ttl is not None else None,
+            }
+        return value
+
+    def invalidate(self, spreadsheet_key=None, worksheet_name=None, reason=None, snapshots=0):
+        """Evicts the entries that depend on a worksheet (or spreadsheet, or everything); returns how many."""
+        with self._lock:
+            evicted = [
+                key for key, entry in self._entries.items()
+                if any(self._matches(tag, spreadsheet_key, worksheet_name) for tag in entry['tags'])
+            ]
+            for key in evicted:
+                del self._entries[key]
+            self.invalidations += 1
+            self.evictions += len(evicted)
+            self.log.append({
+                'at': time.strftime("%H:%M:%S"), 'spreadsheet': spreadsheet_key, 'worksheet': worksheet_name,
+                'reason': reason, 'cache_entries': len(evicted), 'snapshots': snapshots,
+            })
+        return len(evicted)
+
+    def stats(self):
+        """Returns (recent invalidations, newest first, with what each evicted) and counters."""
+        with self._lock:
+            counters = {
+                'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'expired': self.expired,
+                'invalidations': self.invalidations, 'evictions': self.evictions,
+            }
+            return list(reversed(self.log)), counters
+
+
+_TAGGED_CACHE = TaggedCache()
+
+
+def get_tagged_cache():
+    """Returns the process-wide tagged cache."""
+    return _TAGGED_CACHE
+
+
+def cache_by_sheet(url_arg, worksheet_name=None, ttl=None):
+    """Memoizes a function in the tagged cache, tagged with the sheet named by its url_arg argument.
+
+    Like st.cache_data, arguments whose names start with an underscore are left out of the key.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (fn.__module__, fn.__qualname__) + tuple(
+                (name, value) for name, value in bound.arguments.items() if not name.startswith("_")
+            )
+            url = bound.arguments[url_arg]
+            try:
+                tag = (extract_id_from_url(url), worksheet_name)
+            except Exception:
+                tag = (url, worksheet_name)
+            return _TAGGED_CACHE.get_or_compute(key, [tag], lambda: fn(*args, **kwargs), ttl=ttl)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from snapshot_store import SnapshotStore, StaticRevisionSource
+
+
+def make_fetch(frames):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return frames[len(calls) - 1]
+
+    return fetch, calls
+
+
+def test_cached_frame_is_served_until_the_revision_changes():
+    store = SnapshotStore(probe_interval=0)
+    source = StaticRevisionSource({'sheet': 1})
+    fetch, calls = make_fetch([pd.DataFrame({'Name': ['a']}), pd.DataFrame({'Name': ['a', 'b']})])
+
+    first = store.get('sheet', 'Users', fetch, source)
+    again = store.get('sheet', 'Users', fetch, source)
+    assert len(calls) == 1
+    assert again['Name'].tolist() == ['a']
+    assert source.probes == 2
+
+    source.bump('sheet')
+    refreshed = store.get('sheet', 'Users', fetch, source)
+    assert len(calls) == 2
+    assert refreshed['Name'].tolist() == ['a', 'b']
+    assert refreshed.attrs['snapshot_version'] != first.attrs['snapshot_version']
+    assert (store.hits, store.misses) == (1, 2)
+
+
+def test_probe_is_shared_by_the_worksheets_of_a_spreadsheet():
+    store = SnapshotStore(probe_interval=60)
+    source = StaticRevisionSource({'sheet': 1})
+    store.get('sheet', 'Users', lambda: pd.DataFrame({'Name': ['a']}), source)
+    store.get('sheet', 'Admins', lambda: pd.DataFrame({'Name': ['b']}), source)
+    assert source.probes == 1
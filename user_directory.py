@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from snapshot_store import cached_by_snapshot
+
+SEARCH_COLUMNS = ['FullName', 'Phone(login)', 'Email', 'CollegeName']
+DEFAULT_COLUMNS = ['FullName', 'Phone(login)', 'Email', 'CollegeName', 'Branch', 'Role', 'Status']
+
+# Words are split on spaces and on the separators of emails, names and phone numbers.
+_TOKEN_SEPARATORS = r"[\s@.,_\-()]+"
+
+
+class UserDirectory:
+    """Search-as-you-type, sorting and paging over one Users snapshot, on the server.
+
+    Every value of the search columns is indexed whole and word by word in one sorted
+    token array, so a prefix query is two binary searches. A page only materializes
+    page_size rows of the projected columns, however large the sheet is.
+    """
+
+    def __init__(self, df, search_columns=SEARCH_COLUMNS):
+        self._df = df
+        self._orders = {}
+        positions = pd.RangeIndex(len(df))
+        pieces = []
+        for column in search_columns:
+            if column not in df.columns:
+                continue
+            values = pd.Series(df[column].astype(str).str.strip().str.lower().to_numpy(), index=positions)
+            pieces.append(values)
+            pieces.append(values.str.split(_TOKEN_SEPARATORS, regex=True).explode())
+        if pieces:
+            tokens = pd.concat(pieces)
+            tokens = tokens[tokens.str.len() > 0]
+            # A row may appear twice under one token (a name word equal to the whole name); harmless for masks.
+            values = tokens.to_numpy(dtype=str)
+            order = np.argsort(values, kind="stable")
+            self._tokens = values[order]
+            self._rows = tokens.index.to_numpy(dtype=np.int64)[order]
+        else:
+            self._tokens = np.array([], dtype=str)
+            self._rows = np.array([], dtype=np.int64)
+
+    def __len__(self):
+        return len(self._df)
+
+    @property
+    def columns(self):
+        return list(self._df.columns)
+
+    def match(self, query):
+        """Returns a boolean row mask for rows where every query word prefixes some indexed token, or None for no query."""
+        words = str(query or "").strip().lower().split()
+        if not words:
+            return None
+        mask = np.ones(len(self._df), dtype=bool)
+        for word in words:
+            lo = np.searchsorted(self._tokens, word, side="left")
+            hi = np.searchsorted(self._tokens, word + "\uffff", side="left")
+            word_mask = np.zeros(len(self._df), dtype=bool)
+            word_mask[self._rows[lo:hi]] = True
+            mask &= word_mask
+        return mask
+
+    def count(self, query=""):
+        """Returns how many rows match the query."""
+        mask = self.match(query)
+        return len(self._df) if mask is None else int(mask.sum())
+
+    def _order(self, sort_by):
+        order = self._orders.get(sort_by)
+        if order is None:
+            keys = self._df[sort_by].astype(str).str.lower().to_numpy()
+            order = self._orders[sort_by] = np.argsort(keys, kind="stable")
+        return order
+
+    def page(self, query="", sort_by=None, descending=False, page=1, page_size=25, columns=None):
+        """Returns (one page of the matching rows, projected to columns, and the total number of matches)."""
+        if sort_by in self._df.columns:
+            order = self._order(sort_by)
+        else:
+            order = np.arange(len(self._df))
+        if descending:
+            order = order[::-1]
+        mask = self.match(query)
+        if mask is not None:
+            order = order[mask[order]]
+        start = max(page - 1, 0) * page_size
+        columns = [c for c in (columns or self.columns) if c in self._df.columns]
+        col_positions = [self._df.columns.get_loc(c) for c in columns]
+        return self._df.iloc[order[start:start + page_size], col_positions], len(order)
+
+
+def get_user_directory(df):
+    """Returns the directory for a worksheet's frame, rebuilt only when its snapshot changes."""
+    return cached_by_snapshot('users', df, UserDirectory)
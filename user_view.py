@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from enrollment_store import ENROLLMENTS_WORKSHEET_NAME, enroll, get_enrollment_index
 
 def user_main(db_connector):
     """The main function for the User Home page, connected to live Google Sheets."""
@@ -22,10 +23,17 @@ def user_main(db_connector):
         return
 
     # --- Enrollment Logic ---
-    # In a real app, this would be a separate lookup from an 'Enrollments' sheet.
-    # We'll use session_state to simulate enrollment for the current session.
-    if 'enrolled_seminars' not in st.session_state:
-        st.session_state.enrolled_seminars = ["Introduction to Machine Learning"] # Pre-enroll in one for demo
+    # Enrollments live in their own worksheet; the user <-> seminar index is rebuilt once per snapshot.
+    enrollment_sheet = db_connector.get_or_create_worksheet(SEMINAR_SHEET_URL, ENROLLMENTS_WORKSHEET_NAME)
+    enrollment_index = get_enrollment_index(db_connector.get_dataframe(enrollment_sheet))
+    user_phone = st.session_state.get('user_phone')
+    enrolled_seminars = enrollment_index.seminars_for(user_phone) if user_phone else frozenset()
+
+    def enroll_user(seminar_name):
+        if not enrollment_sheet or not user_phone:
+            st.error("Enrollment is not available right now. Please log in again.")
+            return False
+        return enroll(db_connector, enrollment_sheet, enrollment_index, user_phone, st.session_state.user_name, seminar_name)
 
     # --- Data Processing ---
     try:
@@ -54,19 +62,19 @@ def user_main(db_connector):
 
     with tab2:
         st.subheader("Events You Are Registered For")
-        enrolled_df = upcoming_seminars[upcoming_seminars['Seminar_Event_Name'].isin(st.session_state.enrolled_seminars)]
-        display_seminar_list(enrolled_df, "Go to Live Session")
+        enrolled_df = upcoming_seminars[upcoming_seminars['Seminar_Event_Name'].astype(str).str.strip().isin(enrolled_seminars)]
+        display_seminar_list(enrolled_df, "Go to Live Session", enrollment_index)
 
     with tab3:
         st.subheader("Available Events You Can Still Join")
-        yet_to_enroll_df = upcoming_seminars[~upcoming_seminars['Seminar_Event_Name'].isin(st.session_state.enrolled_seminars)]
-        display_seminar_list(yet_to_enroll_df, "Enroll Now")
+        yet_to_enroll_df = upcoming_seminars[~upcoming_seminars['Seminar_Event_Name'].astype(str).str.strip().isin(enrolled_seminars)]
+        display_seminar_list(yet_to_enroll_df, "Enroll Now", enrollment_index, on_enroll=enroll_user)
 
     with tab4:
         st.subheader("Past Seminars for Review and Learning")
         display_seminar_list(completed_seminars, "Review Session")
 
-def display_seminar_list(seminars_df, button_text):
+def display_seminar_list(seminars_df, button_text, enrollment_index=None, on_enroll=None):
     """Helper function to display a list of seminars in expanders."""
     if seminars_df.empty:
         st.info("No seminars to display in this category.")
@@ -77,14 +85,15 @@ def display_seminar_list(seminars_df, button_text):
         with st.expander(expander_title):
             st.markdown(f"**Domain:** {seminar.get('Domain', 'N/A')}")
             st.markdown(f"**Description:** {seminar.get('BriefDescription', 'No description available.')}")
+            if enrollment_index is not None:
+                st.markdown(f"**Enrolled:** {enrollment_index.count(seminar.get('Seminar_Event_Name', ''))}")
             
             button_key = f"{button_text}_{seminar.get('Seminar_Event_Name', index)}"
             if st.button(button_text, key=button_key):
                 # Logic for the "Enroll Now" button
                 if button_text == "Enroll Now":
                     seminar_name = seminar['Seminar_Event_Name']
-                    if seminar_name not in st.session_state.enrolled_seminars:
-                        st.session_state.enrolled_seminars.append(seminar_name)
+                    if on_enroll(seminar_name):
                         st.success(f"You have successfully enrolled in '{seminar_name}'!")
                         st.rerun() # Rerun to move the seminar to the 'Enrolled' tab
                 else:
@@ -0,0 +1,227 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+
+from sheet_schema import SECRET_COLUMNS, WORKSHEET_HEADERS
+
+OUTBOX_PATH = "pragyanai_outbox.db"
+
+# Where each declared tab keeps its SECRET_COLUMNS; those cells are blanked in dead-lettered rows.
+SECRET_POSITIONS = {
+    title: [position for position, header in enumerate(headers) if header in SECRET_COLUMNS]
+    for title, headers in WORKSHEET_HEADERS.items()
+}
+
+
+class WriteBehindQueue:
+    """A durable SQLite outbox that acknowledges appends immediately and flushes them in batches.
+
+    Rows are grouped per (spreadsheet key, worksheet title) and written with one
+    append_rows call per group. Failed groups are retried with jittered exponential backoff;
+    after max_attempts they are moved to a dead-letter table and no longer shown as pending.
+
+    Signup rows carry a Password, so this file is the one exception to keeping SECRET_COLUMNS
+    off disk: a row must survive a restart until it is written. Secrets are kept only until
+    then. Deleted rows are overwritten (secure_delete) and the WAL is truncated after each
+    flush, and dead-lettered rows are stored with their secret cells blanked.
+    """
+
+    def __init__(self, db_path=OUTBOX_PATH, flush_interval=1.0, max_batch=500, base_delay=2.0, max_delay=300.0,
+                 max_attempts=8):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.flushed = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.last_error = None
+        self._append_rows = None
+        self._on_flushed = None
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA secure_delete=ON")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, spreadsheet TEXT NOT NULL, worksheet TEXT NOT NULL, "
+            "row TEXT NOT NULL, enqueued_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt_at REAL NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_target ON outbox (spreadsheet, worksheet)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letters ("
+            "id INTEGER PRIMARY KEY, spreadsheet TEXT NOT NULL, worksheet TEXT NOT NULL, row TEXT NOT NULL, "
+            "enqueued_at REAL NOT NULL, attempts INTEGER NOT NULL, failed_at REAL NOT NULL, error TEXT)"
+        )
+
+    def enqueue(self, spreadsheet_key, worksheet_title, row):
+        """Stores a row durably and wakes the flusher. Returns the outbox id."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (spreadsheet, worksheet, row, enqueued_at) VALUES (?, ?, ?, ?)",
+                (spreadsheet_key, worksheet_title, json.dumps(list(row), default=str), time.time())
+            )
+        self._wake.set()
+        return cursor.lastrowid
+
+    def pending_rows(self, spreadsheet_key, worksheet_title):
+        """Returns the rows still waiting to be written to a worksheet, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT row FROM outbox WHERE spreadsheet = ? AND worksheet = ? ORDER BY id",
+                (spreadsheet_key, worksheet_title)
+            ).fetchall()
+        return [json.loads(row) for (row,) in rows]
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def dead_letters(self, limit=100):
+        """Returns the rows that were given up on, newest first, with their secret cells blanked."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT spreadsheet, worksheet, row, enqueued_at, attempts, failed_at, error FROM dead_letters "
+                "ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {
+                'spreadsheet': spreadsheet_key, 'worksheet': worksheet_title, 'row': json.loads(row),
+                'enqueued_at': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(enqueued_at)),
+                'attempts': attempts, 'failed_at': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(failed_at)),
+                'error': error,
+            }
+            for spreadsheet_key, worksheet_title, row, enqueued_at, attempts, failed_at, error in rows
+        ]
+
+    def report(self):
+        """Returns (dead-lettered rows, outbox counters)."""
+        with self._lock:
+            dead = self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+        counters = {
+            'pending': self.pending_count(), 'flushed': self.flushed, 'failures': self.failures,
+            'dead_letters': dead, 'last_error': self.last_error,
+        }
+        return self.dead_letters(), counters
+
+    def _dead_letter(self, spreadsheet_key, worksheet_title, entries, attempts, error):
+        """Moves a group that used up its attempts out of the outbox, dropping its secrets."""
+        secret = SECRET_POSITIONS.get(worksheet_title, [])
+        now = time.time()
+        ids = [entry_id for entry_id, _, _, _ in entries]
+        placeholders = ", ".join("?" * len(ids))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO dead_letters (id, spreadsheet, worksheet, row, enqueued_at, attempts, failed_at, error) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (entry_id, spreadsheet_key, worksheet_title,
+                         json.dumps(["" if position in secret else value for position, value in enumerate(row)]),
+                         enqueued_at, attempts, now, error)
+                        for entry_id, row, _, enqueued_at in entries
+                    ]
+                )
+                self._conn.execute(f"DELETE FROM outbox WHERE id IN ({placeholders})", ids)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.dead_lettered += len(ids)
+
+    def _purge(self):
+        """Truncates the WAL, so rows deleted from the outbox (and their secrets) do not linger in it."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def start(self, append_rows, on_flushed=None):
+        """Starts the background flusher; append_rows(spreadsheet_key, worksheet_title, rows) does the write.
+
+        on_flushed(spreadsheet_key, worksheet_title) is called once rows have left the outbox (written
+        or dead-lettered), so readers never see them both in the sheet and as pending rows.
+        """
+        with self._lock:
+            self._append_rows = append_rows
+            self._on_flushed = on_flushed
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sheets-write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush_once()
+            except Exception as e:
+                self.last_error = str(e)
+
+    def flush_once(self):
+        """Writes every due group of rows. Returns the number of rows flushed."""
+        with self._lock:
+            due = self._conn.execute(
+                "SELECT id, spreadsheet, worksheet, row, attempts, enqueued_at FROM outbox "
+                "WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), self.max_batch)
+            ).fetchall()
+        groups = {}
+        for entry_id, spreadsheet_key, worksheet_title, row, attempts, enqueued_at in due:
+            groups.setdefault((spreadsheet_key, worksheet_title), []).append(
+                (entry_id, json.loads(row), attempts, enqueued_at)
+            )
+
+        flushed, removed = 0, False
+        for (spreadsheet_key, worksheet_title), entries in groups.items():
+            ids = [entry_id for entry_id, _, _, _ in entries]
+            placeholders = ", ".join("?" * len(ids))
+            try:
+                self._append_rows(spreadsheet_key, worksheet_title, [row for _, row, _, _ in entries])
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                attempts = max(a for _, _, a, _ in entries) + 1
+                if attempts >= self.max_attempts:
+                    # e.g. the tab was deleted: stop retrying, and stop overlaying the rows as pending
+                    self._dead_letter(spreadsheet_key, worksheet_title, entries, attempts, str(e))
+                    removed = True
+                    if self._on_flushed is not None:
+                        self._on_flushed(spreadsheet_key, worksheet_title)
+                    continue
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                delay *= random.uniform(0.5, 1.0)
+                with self._lock:
+                    self._conn.execute(
+                        f"UPDATE outbox SET attempts = ?, next_attempt_at = ? WHERE id IN ({placeholders})",
+                        [attempts, time.time() + delay] + ids
+                    )
+                continue
+            with self._lock:
+                self._conn.execute(f"DELETE FROM outbox WHERE id IN ({placeholders})", ids)
+            flushed += len(ids)
+            removed = True
+            if self._on_flushed is not None:
+                self._on_flushed(spreadsheet_key, worksheet_title)
+        if removed:
+            self._purge()
+        self.flushed += flushed
+        return flushed
+
+
+_QUEUE = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_write_queue():
+    """Returns the process-wide write-behind queue."""
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = WriteBehindQueue()
+        return _QUEUE